@@ -0,0 +1,168 @@
+# refactored_mihomo/benchmarks/fixtures.py
+"""
+基准测试用的离线素材：按固定随机种子生成与 85la.com 结构一致的首页、文章页和订阅 YAML，
+并通过本地 HTTP 服务器提供，测试结果不依赖线上网站。
+"""
+import random
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEED = 85
+NEWEST_DATE = date(2025, 1, 31)
+# 规模 -> (首页文章数, 文章正文段落数, 订阅节点数)
+SIZES = {
+    "small": (20, 20, 100),
+    "medium": (200, 200, 1000),
+    "large": (2000, 2000, 10000),
+}
+ENCODINGS = ("utf-8", "gbk")
+FILLER = "免费节点分享，每日更新高速稳定的订阅链接，支持 Clash、Mihomo、V2Ray 等客户端。"
+REGIONS = ("香港", "台湾", "日本", "新加坡", "美国", "韩国", "德国", "英国")
+EMOJI = ("🇭🇰", "🇹🇼", "🇯🇵", "🇸🇬", "🇺🇸", "🇰🇷", "🇩🇪", "🇬🇧")
+
+
+def post_path(day):
+    return f"/{day:%Y/%m/%d}/free-node.html"
+
+
+def yaml_path(size, encoding):
+    return f"/wp-content/uploads/{size}-{encoding}.yaml"
+
+
+def homepage_html(posts, encoding):
+    """生成包含 posts 篇节点文章的首页，日期从 NEWEST_DATE 起逐日递减。"""
+    rng = random.Random(SEED)
+    parts = [f'<!DOCTYPE html><html><head><meta charset="{encoding}"><title>85LA</title>'
+             '<style>.post-title{font-size:18px}</style></head><body><div class="container">']
+    for i in range(posts):
+        day = NEWEST_DATE - timedelta(days=i)
+        parts.append(f'<article class="post"><h2 class="post-title"><a href="{post_path(day)}">'
+                     f'{day.year}年{day.month}月{day.day}日 免费节点订阅 {rng.randint(10, 99)} 个高速节点</a></h2>'
+                     f'<div class="excerpt"><p>{FILLER * rng.randint(1, 3)}</p></div></article>')
+    parts.append('</div><script>var ads = [];</script></body></html>')
+    return "".join(parts)
+
+
+def post_html(paragraphs, encoding, base_url):
+    """生成文章页：正文中夹杂 clash.meta、mihomo 和 v2ray 三种订阅链接，正文后有评论区。"""
+    rng = random.Random(SEED)
+    uploads = base_url.rstrip("/") + "/wp-content/uploads"
+    parts = [f'<!DOCTYPE html><html><head><meta charset="{encoding}"><title>免费节点</title></head><body>'
+             '<div class="entry-content">']
+    for i in range(paragraphs):
+        parts.append(f"<p>{FILLER * rng.randint(1, 2)}</p>")
+        if i == paragraphs // 2:
+            parts.append(f'<p>clash.meta 订阅链接：<a href="{uploads}/meta.yaml">{uploads}/meta.yaml</a></p>'
+                         f'<p>mihomo 订阅链接：<a href="{uploads}/mihomo.yaml">{uploads}/mihomo.yaml</a></p>'
+                         f'<p>v2ray 订阅链接：<a href="{uploads}/v2ray.txt">{uploads}/v2ray.txt</a></p>')
+    parts.append('</div><div class="comments">')
+    parts.extend(f"<p>评论 {i}：{FILLER}</p>" for i in range(paragraphs))
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def subscription_yaml(proxies, encoding):
+    """生成订阅配置，约 10% 的节点是重复的；GBK 无法表示 emoji，此时名称不带国旗。"""
+    rng = random.Random(SEED)
+    lines = ["port: 7890", "allow-lan: false", "mode: rule", "proxies:"]
+    names = []
+    for i in range(proxies):
+        n = rng.randrange(proxies) if i and rng.random() < 0.1 else i
+        region = n % len(REGIONS)
+        flag = EMOJI[region] + " " if encoding == "utf-8" else ""
+        name = f"{flag}{REGIONS[region]} {i:05d} | 85la.com"
+        names.append(name)
+        lines.append(f'  - {{name: "{name}", type: ss, server: 10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}, '
+                     f'port: {443 + n % 100}, cipher: aes-128-gcm, password: "pw{n}"}}')
+    lines.append("proxy-groups:")
+    lines.append('  - {name: 节点选择, type: select, proxies: [自动选择, ' + ", ".join(f'"{n}"' for n in names) + "]}")
+    lines.append('  - {name: 自动选择, type: url-test, url: "http://www.gstatic.com/generate_204", interval: 300, '
+                 "proxies: [" + ", ".join(f'"{n}"' for n in names) + "]}")
+    lines.append("rules:")
+    lines.append("  - MATCH,节点选择")
+    return "\n".join(lines) + "\n"
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # 扫描器提前结束读取时客户端会断开连接，属于预期行为
+
+
+class FixtureServer:
+    """
+    在本地随机端口提供素材的 HTTP 服务器（后台线程运行）。
+    GBK 素材的 Content-Type 不带 charset，由客户端自行识别编码。
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.httpd = QuietHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}/"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _handler(self):
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, with_body):
+                route = routes.get(self.path)
+                if route is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, content_type = route
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if with_body:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # 客户端提前结束读取
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def add(self, path, text, encoding, content_type):
+        body = text.encode(encoding)
+        if encoding == "utf-8":
+            content_type += "; charset=utf-8"
+        self.routes[path] = (body, content_type)
+        return len(body)
+
+    def populate(self):
+        """生成全部规模和编码的素材，返回 {(类型, 规模, 编码): (路径, 字节数)}。"""
+        catalog = {}
+        for size, (posts, paragraphs, proxies) in SIZES.items():
+            for encoding in ENCODINGS:
+                home = f"/{size}-{encoding}/"
+                catalog[("homepage", size, encoding)] = (
+                    home, self.add(home, homepage_html(posts, encoding), encoding, "text/html"))
+                post = f"/{size}-{encoding}{post_path(NEWEST_DATE)}"
+                catalog[("post", size, encoding)] = (
+                    post, self.add(post, post_html(paragraphs, encoding, self.base_url), encoding, "text/html"))
+                path = yaml_path(size, encoding)
+                catalog[("save", size, encoding)] = (
+                    path, self.add(path, subscription_yaml(proxies, encoding), encoding, "text/plain"))
+        return catalog
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,228 @@
+# refactored_mihomo/benchmarks/pipeline_bench.py
+"""
+离线流水线基准：通过本地 HTTP 服务器回放固定素材，分别测量首页索引（find_post_by_date）、
+链接提取（extract_mihomo_urls）和下载保存（save_subscription_url）三个阶段在不同规模、
+不同编码（UTF-8 / GBK）下的耗时中位数、吞吐量和峰值内存，并与保存的基线比较。
+
+    python benchmarks/pipeline_bench.py [--runs 5] [--only homepage,post,save,startup,probe] [--update-baseline]
+
+同时运行 startup（startup_budget.py）和 probe（probe_check.py）检查。超出基线阈值的用例会再测量几轮确认，
+确认后仍超出阈值、或任一检查失败时以非零状态退出。
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import probe_check, startup_budget  # noqa: E402
+from benchmarks.fixtures import FixtureServer, SIZES, ENCODINGS, NEWEST_DATE  # noqa: E402
+from src.core.file_manager import MihomoFileManager  # noqa: E402
+from src.core.http_client import MihomoHttpClient  # noqa: E402
+from src.core.network import MihomoNetwork  # noqa: E402
+from src.core.subscription import LA85Provider  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+STAGES = ("homepage", "post", "save")
+# 只判断通过与否、不记入基线的检查：名称 -> main(argv)，返回非零表示失败
+CHECKS = {"startup": startup_budget.main, "probe": probe_check.main}
+# 默认阈值：耗时超出基线 30% 或峰值内存超出 25% 视为退化；小于 MIN_DELTA_MS 的耗时变化视为噪声
+# （几毫秒的用例在同一台机器上的波动就可达 ±30%）
+LATENCY_THRESHOLD = 0.30
+MEMORY_THRESHOLD = 0.25
+MIN_DELTA_MS = 10.0
+# 超出阈值的用例再测量的轮数，取各轮中位数的中位数后重新判断
+CONFIRM_ROUNDS = 2
+
+
+class NullLogger:
+    def log(self, message, level="INFO"):
+        pass
+
+
+class StageRunner:
+    """
+    为每次运行创建不带 HTTP 缓存和状态库的新客户端，保证每次都完整地走一遍网络和解析。
+    """
+
+    def __init__(self, base_url, save_dir):
+        self.base_url = base_url
+        self.save_dir = save_dir
+
+    def _services(self, home):
+        client = MihomoHttpClient(10, 5, 4)
+        network = MihomoNetwork(self.base_url.rstrip("/") + home, 10, 1, NullLogger(), lambda: True,
+                                http_client=client)
+        return client, network
+
+    def homepage(self, path, expected):
+        client, network = self._services(path)
+        try:
+            # 以最早的日期为目标，强制扫描整个首页；标题规则取自 85LA 来源
+            provider = LA85Provider(network, MihomoFileManager(self.save_dir, NullLogger(), http_client=client))
+            oldest = NEWEST_DATE - timedelta(days=expected - 1)
+            index = network.build_homepage_index(oldest, provider.heading_classes, provider.post_date)
+            assert index is not None and len(index) == expected, "首页索引不完整"
+            assert network.find_post_by_date(oldest, index), "未找到目标文章"
+        finally:
+            client.close()
+
+    def post(self, path, expected):
+        client, network = self._services("/")
+        try:
+            urls = network.extract_mihomo_urls(self.base_url.rstrip("/") + path)
+            assert len(urls) == expected, f"提取到 {len(urls)} 个链接，应为 {expected} 个"
+        finally:
+            client.close()
+
+    def save(self, path, expected):
+        client = MihomoHttpClient(10, 5, 4)
+        try:
+            manager = MihomoFileManager(self.save_dir, NullLogger(), http_client=client, probe_action=None)
+            assert manager.save_subscription_url(self.base_url.rstrip("/") + path), "保存失败"
+        finally:
+            client.close()
+
+
+def measure(func, runs):
+    """预热一次后运行 runs 次取耗时中位数（毫秒），再单独运行一次用 tracemalloc 统计峰值内存（KB）。"""
+    func()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(samples), peak / 1024
+
+
+def run_benchmarks(stages, runs, names=None):
+    """返回 {用例名: {"median_ms", "mb_per_s", "peak_kb", "bytes"}}；names 不为空时只运行其中的用例。"""
+    results = {}
+    save_dir = tempfile.mkdtemp(prefix="mihomo-bench-")
+    try:
+        with FixtureServer() as server:
+            catalog = server.populate()
+            runner = StageRunner(server.base_url, save_dir)
+            for stage in stages:
+                for size in SIZES:
+                    for encoding in ENCODINGS:
+                        name = f"{stage}/{size}/{encoding}"
+                        if names and name not in names:
+                            continue
+                        path, nbytes = catalog[(stage, size, encoding)]
+                        # 首页应索引到全部文章；文章页只应提取出 mihomo 链接（clash.meta 和 v2ray 被排除）
+                        expected = {"homepage": SIZES[size][0], "post": 1, "save": None}[stage]
+                        func = getattr(runner, stage)
+                        median_ms, peak_kb = measure(lambda: func(path, expected), runs)
+                        results[name] = {
+                            "median_ms": round(median_ms, 2),
+                            "mb_per_s": round(nbytes / 1024 / 1024 / (median_ms / 1000), 2),
+                            "peak_kb": round(peak_kb, 1),
+                            "bytes": nbytes,
+                        }
+                        print(f"{name:<24} {median_ms:9.2f} ms {results[name]['mb_per_s']:9.2f} MB/s "
+                              f"{peak_kb:10.1f} KB", flush=True)
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
+    return results
+
+
+def confirm(results, regressed, stages, runs):
+    """对 regressed 中的用例再测量 CONFIRM_ROUNDS 轮，耗时和峰值内存改为各轮的中位数。"""
+    rounds = {name: [results[name]] for name in regressed}
+    for _ in range(CONFIRM_ROUNDS):
+        for name, result in run_benchmarks(stages, runs, regressed).items():
+            rounds[name].append(result)
+    for name, samples in rounds.items():
+        median_ms = statistics.median(sample["median_ms"] for sample in samples)
+        results[name] = dict(results[name], median_ms=round(median_ms, 2),
+                             mb_per_s=round(results[name]["bytes"] / 1024 / 1024 / (median_ms / 1000), 2),
+                             peak_kb=statistics.median(sample["peak_kb"] for sample in samples))
+
+
+def compare(results, baseline):
+    """与基线比较，返回 {用例名: 退化描述列表}。"""
+    thresholds = baseline.get("thresholds", {})
+    latency_limit = thresholds.get("latency", LATENCY_THRESHOLD)
+    memory_limit = thresholds.get("memory", MEMORY_THRESHOLD)
+    min_delta = thresholds.get("min_delta_ms", MIN_DELTA_MS)
+    regressions = {}
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        delta_ms = current["median_ms"] - previous["median_ms"]
+        if delta_ms > min_delta and current["median_ms"] > previous["median_ms"] * (1 + latency_limit):
+            regressions.setdefault(name, []).append(
+                f"{name}: 耗时 {previous['median_ms']:.2f} -> {current['median_ms']:.2f} ms")
+        if current["peak_kb"] > previous["peak_kb"] * (1 + memory_limit):
+            regressions.setdefault(name, []).append(
+                f"{name}: 峰值内存 {previous['peak_kb']:.1f} -> {current['peak_kb']:.1f} KB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线回放素材，测量流水线各阶段性能并与基线比较")
+    parser.add_argument("--runs", type=int, default=5, help="每个用例的测量次数，取中位数")
+    parser.add_argument("--only", default=",".join(STAGES + tuple(CHECKS)),
+                        help="只运行指定阶段和检查（逗号分隔）：" + ",".join(STAGES + tuple(CHECKS)))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",")
+    stages = [stage for stage in selected if stage in STAGES]
+    results = run_benchmarks(stages, args.runs) if stages else {}
+    checks_failed = False
+    for name in selected:
+        if name in CHECKS:
+            checks_failed |= CHECKS[name]([]) != 0
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        # 基线同样取多轮测量的中位数，避免记下一次偶然偏快的结果
+        confirm(results, list(results), stages, args.runs)
+        baseline.setdefault("thresholds", {"latency": LATENCY_THRESHOLD, "memory": MEMORY_THRESHOLD,
+                                           "min_delta_ms": MIN_DELTA_MS})
+        baseline.setdefault("results", {}).update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"✅ 基线已更新：{args.baseline}")
+        return 1 if checks_failed else 0
+    if not baseline:
+        print("⚠️ 没有基线文件，使用 --update-baseline 生成")
+        return 1 if checks_failed else 0
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"超出阈值的用例再测量 {CONFIRM_ROUNDS} 轮确认：{', '.join(regressions)}", flush=True)
+        confirm(results, list(regressions), stages, args.runs)
+        regressions = compare(results, baseline)
+    for lines in regressions.values():
+        for line in lines:
+            print(f"❌ {line}")
+    if results and not regressions:
+        print("✅ 所有用例均在基线阈值之内")
+    return 1 if regressions or checks_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
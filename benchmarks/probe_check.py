@@ -0,0 +1,85 @@
+# refactored_mihomo/benchmarks/probe_check.py
+"""
+节点探测检查：在本机启动一个监听端口并占用一个已关闭的端口，确认 NodeProber 对可用节点记录延迟、
+对不可用节点判为失败、跳过 UDP 节点，apply_probe_results 的剔除和排序结果正确，
+且取消令牌能中止卡在 TLS 握手上的探测。任一项不符合时以非零状态退出。
+
+    python benchmarks/probe_check.py
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.core.cancellation import CancelToken, Cancelled  # noqa: E402
+from src.core.prober import NodeProber, apply_probe_results, PROBE_PRUNE, PROBE_SORT  # noqa: E402
+
+TIMEOUT = 2.0
+
+
+def closed_port():
+    """返回一个当前没有监听的本地端口。"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def check(results, condition, message):
+    results.append((condition, message))
+
+
+def main(argv=None):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+    open_port = listener.getsockname()[1]
+    dead_port = closed_port()
+    proxies = [
+        {"name": "dead", "type": "ss", "server": "127.0.0.1", "port": dead_port},
+        {"name": "udp", "type": "hysteria2", "server": "127.0.0.1", "port": dead_port},
+        {"name": "alive", "type": "ss", "server": "127.0.0.1", "port": open_port},
+    ]
+    prober = NodeProber(concurrency=8, timeout=TIMEOUT)
+    outcomes = []
+    try:
+        results = prober.run(proxies)
+        by_name = {r.name: r for r in results}
+        check(outcomes, by_name["alive"].latency is not None and 0 <= by_name["alive"].latency < TIMEOUT * 1000,
+              "监听端口应记录延迟")
+        check(outcomes, by_name["dead"].latency is None and not by_name["dead"].alive, "关闭的端口应判为不可用")
+        check(outcomes, by_name["udp"].skipped and by_name["udp"].alive, "UDP 节点应跳过且保留")
+        pruned = [p["name"] for p in apply_probe_results(proxies, results, PROBE_PRUNE)]
+        check(outcomes, pruned == ["udp", "alive"], f"剔除结果应为 udp, alive，实际为 {pruned}")
+        ordered = [p["name"] for p in apply_probe_results(proxies, results, PROBE_SORT)]
+        check(outcomes, ordered == ["alive", "udp", "dead"], f"排序结果应为 alive, udp, dead，实际为 {ordered}")
+
+        # 监听端口不回应 TLS 握手，探测会一直等到超时；取消令牌应立即中止
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        started = time.perf_counter()
+        try:
+            prober.run([{"name": "stuck", "type": "trojan", "server": "127.0.0.1", "port": open_port}], token)
+            aborted = False
+        except Cancelled:
+            aborted = True
+        elapsed = time.perf_counter() - started
+        check(outcomes, aborted and elapsed < TIMEOUT / 2, f"取消后应立即中止探测（耗时 {elapsed:.2f} 秒）")
+    finally:
+        listener.close()
+
+    failed = [message for ok, message in outcomes if not ok]
+    for message in failed:
+        print(f"❌ {message}")
+    if not failed:
+        print(f"✅ 节点探测检查通过（{len(outcomes)} 项）")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# refactored_mihomo/benchmarks/startup_budget.py
+"""
+启动耗时预算检查：用 `python -X importtime` 统计导入 GUI 主模块的累计耗时，
+并确认网络栈没有在启动阶段被导入。超出预算时以非零状态退出。
+
+    python benchmarks/startup_budget.py [--budget-ms 80] [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_MODULE = "src.gui.main_window"
+# 这些模块应当在首次查找时才导入
+DEFERRED_MODULES = ("requests", "urllib3", "asyncio", "src.core.network", "src.core.pipeline",
+                    "src.core.http_client", "src.core.file_manager", "sqlite3", "yaml")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_once():
+    """返回 (入口模块累计耗时微秒, 启动阶段导入的模块名集合)。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    total, modules = None, set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        modules.add(match.group(4))
+        if match.group(4) == ENTRY_MODULE:
+            total = int(match.group(2))
+    return total, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查 GUI 启动导入耗时是否在预算之内")
+    parser.add_argument("--budget-ms", type=float, default=80.0, help="入口模块累计导入耗时上限（毫秒）")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数，取中位数")
+    args = parser.parse_args(argv)
+
+    samples, imported = [], set()
+    for _ in range(args.runs):
+        total, modules = measure_once()
+        samples.append(total / 1000)
+        imported |= modules
+    median_ms = statistics.median(samples)
+    eager = sorted(name for name in DEFERRED_MODULES if name in imported)
+
+    print(f"{ENTRY_MODULE} 导入耗时中位数: {median_ms:.1f} ms（预算 {args.budget_ms:.0f} ms）")
+    failed = False
+    if median_ms > args.budget_ms:
+        print("❌ 超出启动耗时预算")
+        failed = True
+    if eager:
+        print(f"❌ 以下模块应延迟导入: {', '.join(eager)}")
+        failed = True
+    if not failed:
+        print("✅ 启动耗时在预算之内")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,4 +4,36 @@
 SAVE_DIR = r"D:\Tool\Proxy\Yaml"
 BASE_URL = "https://www.85la.com/"
 TIMEOUT = 15
-RETRY = 3
\ No newline at end of file
+RETRY = 3
+CONNECT_TIMEOUT = 5   # 建立连接（TCP+TLS）的超时时间，读取超时使用 TIMEOUT
+POOL_MAXSIZE = 10     # 每个主机保持的 keep-alive 连接数上限
+VALIDATE_WORKERS = 8  # 订阅链接并发验证的线程数上限
+VALIDATE_PER_HOST = 2 # 同一主机同时进行的验证请求数上限
+VALIDATE_RATE = 5     # 验证请求的全局速率（每秒）
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024  # SAVE_DIR/.http_cache 的容量上限，超出后按 LRU 淘汰
+MAX_YAML_BYTES = 20 * 1024 * 1024        # 单个订阅文件允许下载的最大字节数
+LOG_MAX_BYTES = 5 * 1024 * 1024          # mihomo_auto.log 超过该大小时轮转
+LOG_BACKUP_COUNT = 3                     # 保留的历史日志文件数量
+LOG_ROTATE_WHEN = None                   # 按时间轮转（如 "midnight"），为 None 时按大小轮转
+LOG_JSON = False                         # 日志文件是否输出为 JSON Lines
+UI_TICK_MS = 100                         # 界面更新队列的刷新节拍（毫秒）
+LOG_VIEW_MAX_LINES = 1000                # 运行日志框最多保留的行数
+MERGE_MODE = False                       # 是否合并全部有效订阅的节点（否则只保存第一个有效订阅）
+MERGE_DEADLINE = 30                      # 合并模式下等待各订阅下载的最长时间（秒），超时的订阅被跳过
+PROBE_ACTION = None                      # 保存前探测节点连通性："prune" 剔除不可用节点，"sort" 按延迟排序，None 不探测
+PROBE_CONCURRENCY = 64                   # 同时进行的节点探测连接数
+PROBE_TIMEOUT = 3                        # 单个节点探测（TCP 连接及 TLS 握手）的截止时间（秒）
+STATE_POST_TTL = 24 * 3600               # 状态库中 日期 -> 文章链接 记录的有效期（秒）
+STATE_URLS_TTL = 6 * 3600                # 文章 -> 订阅链接 记录的有效期（秒）
+STATE_VALIDATION_TTL = 30 * 60           # 订阅链接验证结果及内容哈希的有效期（秒）
+REFRESH_DEADLINE = 180                   # 一次刷新的总时限（秒），按比例分给查找、验证下载和保存阶段；None 不限时
+STATE_HOST_TTL = 24 * 3600               # 主机失败记录的有效期（秒），超过后重新计数
+BREAKER_THRESHOLD = 3                    # 同一主机连续失败多少次后熔断
+BREAKER_COOLDOWN = 5 * 60                # 熔断持续时间（秒），之后放行请求试探
+HEDGE_DEFAULT_DELAY = 1.0                # 首字节耗时样本不足时的对冲等待时间（秒）
+HEDGE_MIN_DELAY = 0.2                    # 对冲等待时间下限（秒）
+HEDGE_MAX_DELAY = 3.0                    # 对冲等待时间上限（秒），主镜像超过该时间仍无响应即启用备用镜像
+SOURCE_DEADLINE = 30                     # 同时查询多个订阅来源时，等待更新来源的时限（秒），之后采用已找到的最新结果
+SNAPSHOT_KEEP = 30                       # SAVE_DIR/history 中最多保留的 85LA.yaml 历史版本数
+SNAPSHOT_MAX_AGE = 30 * 24 * 3600        # 历史版本的最长保留时间（秒），最新版本始终保留
+BLOCKING_WORKERS = 16                    # 执行阻塞请求和文件操作的共享线程池大小
\ No newline at end of file
@@ -0,0 +1,147 @@
+# refactored_mihomo/src/cli.py
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from datetime import datetime
+
+from src.core.http_cache import HttpCache
+from src.core.http_client import MihomoHttpClient
+from src.core.host_health import HostHealth
+from src.core.network import MihomoNetwork
+from src.core.state_store import StateStore
+from src.core.file_manager import MihomoFileManager
+from src.core.prober import PROBE_PRUNE, PROBE_SORT
+from src.core.pipeline import (MihomoPipeline, STATUS_SUCCESS, STATUS_NOT_FOUND,
+                               STATUS_NETWORK_ERROR, STATUS_SAVE_FAILED, STATUS_TIMEOUT)
+from src.utils.logger import MihomoLogger
+from src.utils.constants import (SAVE_DIR, BASE_URL, TIMEOUT, RETRY, CONNECT_TIMEOUT, POOL_MAXSIZE,
+                                 MERGE_MODE, PROBE_ACTION, REFRESH_DEADLINE)
+
+# 结构化退出码，便于 cron / systemd 判断结果（argparse 参数错误固定为 2）
+EXIT_OK = 0
+EXIT_NOT_FOUND = 3
+EXIT_NETWORK_ERROR = 4
+EXIT_SAVE_FAILED = 5
+EXIT_TIMEOUT = 6
+EXIT_INTERRUPTED = 130
+
+EXIT_CODES = {
+    STATUS_SUCCESS: EXIT_OK,
+    STATUS_NOT_FOUND: EXIT_NOT_FOUND,
+    STATUS_NETWORK_ERROR: EXIT_NETWORK_ERROR,
+    STATUS_SAVE_FAILED: EXIT_SAVE_FAILED,
+    STATUS_TIMEOUT: EXIT_TIMEOUT,
+}
+
+
+class MihomoHeadless:
+    """
+    无界面的订阅刷新程序，复用 MihomoNetwork / MihomoFileManager。
+    同一实例多次刷新时共享连接池、HTTP 缓存和解析结果；状态库让重复运行跳过已解析过的步骤。
+    """
+
+    def __init__(self, save_dir=SAVE_DIR, base_url=BASE_URL, merge=MERGE_MODE, probe=PROBE_ACTION,
+                 deadline=REFRESH_DEADLINE):
+        os.makedirs(save_dir, exist_ok=True)
+        self.running = True
+        self.logger = MihomoLogger(save_dir)
+        self.state_store = StateStore(os.path.join(save_dir, "state.db"))
+        self.http_client = MihomoHttpClient(TIMEOUT, CONNECT_TIMEOUT, POOL_MAXSIZE,
+                                            cache=HttpCache(os.path.join(save_dir, ".http_cache")),
+                                            health=HostHealth(self.state_store))
+        self.network = MihomoNetwork(base_url, TIMEOUT, RETRY, self.logger, lambda: self.running,
+                                     http_client=self.http_client, state_store=self.state_store)
+        self.file_manager = MihomoFileManager(save_dir, self.logger, http_client=self.http_client,
+                                              probe_action=probe)
+        self.pipeline = MihomoPipeline(
+            self.network, self.file_manager,
+            on_result=lambda desc, status, url: self.logger.log(f"{desc}: {status} {url}"),
+            merge=merge,
+            deadline=deadline
+        )
+
+    async def run_once(self, start_date=None):
+        """执行一次刷新，返回退出码。"""
+        result = await self.pipeline.refresh(start_date)
+        for line in self.pipeline.metrics.summary():
+            self.logger.log(f"⏱ {line}", "INFO")
+        return EXIT_CODES[result.status]
+
+    async def run_daemon(self, interval, retry_interval):
+        """
+        常驻模式：按固定间隔刷新；失败时改用较短的 retry_interval 重试。收到 SIGINT/SIGTERM 后退出。
+        """
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows 下由 KeyboardInterrupt 处理
+        self.logger.log(f"守护模式启动，刷新间隔 {interval} 秒", "INFO")
+        while not stop.is_set():
+            started = loop.time()
+            refresh = asyncio.create_task(self.run_once())
+            stopper = asyncio.create_task(stop.wait())
+            await asyncio.wait({refresh, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            stopper.cancel()
+            if not refresh.done():
+                refresh.cancel()
+                break
+            try:
+                code = refresh.result()
+            except Exception as e:
+                # 单次刷新出错不应结束守护进程，按失败处理并稍后重试
+                self.logger.log(f"刷新过程中出错: {e}", "ERROR")
+                code = None
+            delay = interval if code == EXIT_OK else retry_interval
+            delay = max(0, delay - (loop.time() - started))
+            self.logger.log(f"下次刷新将在 {int(delay)} 秒后进行", "INFO")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        self.logger.log("守护模式已停止", "INFO")
+        return EXIT_OK
+
+    def close(self):
+        self.running = False
+        self.http_client.close()
+        self.state_store.close()
+        self.logger.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mihomo Subscriber 命令行模式（无需图形界面）")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行并按间隔定时刷新")
+    parser.add_argument("--interval", type=int, default=60, help="守护模式刷新间隔（分钟），默认 60")
+    parser.add_argument("--retry-interval", type=int, default=10, help="刷新失败后的重试间隔（分钟），默认 10")
+    parser.add_argument("--date", type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
+                        help="单次模式下开始回溯的日期（YYYY-MM-DD），默认今天")
+    parser.add_argument("--save-dir", default=SAVE_DIR, help="配置文件保存目录")
+    parser.add_argument("--merge", action="store_true", default=MERGE_MODE,
+                        help="下载全部有效订阅并合并节点，而不是只保存第一个")
+    parser.add_argument("--probe", choices=(PROBE_PRUNE, PROBE_SORT), default=PROBE_ACTION,
+                        help="保存前探测节点连通性：prune 剔除不可用节点，sort 按延迟排序")
+    parser.add_argument("--deadline", type=float, default=REFRESH_DEADLINE,
+                        help=f"单次刷新的总时限（秒），默认 {REFRESH_DEADLINE}；0 表示不限时")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = MihomoHeadless(args.save_dir, merge=args.merge, probe=args.probe, deadline=args.deadline or None)
+    try:
+        if args.daemon:
+            return asyncio.run(app.run_daemon(args.interval * 60, args.retry_interval * 60))
+        return asyncio.run(app.run_once(args.date))
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
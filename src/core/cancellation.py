@@ -0,0 +1,220 @@
+# refactored_mihomo/src/core/cancellation.py
+import asyncio
+import contextvars
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+
+from src.utils.constants import BLOCKING_WORKERS
+
+# 传给 requests 的超时不能为 0，剩余时间不足时使用的最小值
+MIN_TIMEOUT = 0.05
+
+
+class Cancelled(Exception):
+    """操作因取消或超过期限而中止。"""
+
+
+class CancelToken:
+    """
+    线程安全的取消令牌，可带总期限（秒）。
+    网络和文件操作在阻塞前后检查令牌；退避等待可被立即唤醒；
+    on_cancel() 注册的回调在取消或到期时执行，用于中止正在读取的响应。
+    child() / split() 派生出期限更短的子令牌，父令牌取消时子令牌一并取消。
+    """
+
+    def __init__(self, deadline=None):
+        self.event = threading.Event()
+        self.expires = time.monotonic() + deadline if deadline else None
+        self.callbacks = {}
+        self.keys = itertools.count()
+        self.lock = threading.Lock()
+        self.detach = None
+        # 有回调等待时才启动的到期定时器
+        self.timer = None
+
+    @property
+    def cancelled(self):
+        return self.event.is_set() or (self.expires is not None and time.monotonic() >= self.expires)
+
+    def cancel(self):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            callbacks = list(self.callbacks.values())
+            self.callbacks.clear()
+            if self.timer:
+                self.timer.cancel()
+        if self.detach:
+            self.detach()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def remaining(self):
+        """剩余秒数；没有期限时返回 None。"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            expired = self.expires is not None and time.monotonic() >= self.expires
+            raise Cancelled("超过期限" if expired else "已取消")
+
+    def wait(self, seconds):
+        """可中断的等待，最多等到期限为止；返回 True 表示已被取消或超时。"""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self.event.wait(seconds)
+        return self.cancelled
+
+    def timeout(self, timeout):
+        """把请求超时（秒数或 (连接, 读取) 元组）限制在剩余时间之内。"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        remaining = max(MIN_TIMEOUT, remaining)
+        if isinstance(timeout, tuple):
+            return tuple(min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+    def _register(self, callback):
+        """注册取消回调，返回注销函数；已取消时立即执行回调。有期限时启动到期定时器。"""
+        with self.lock:
+            if not self.event.is_set():
+                key = next(self.keys)
+                self.callbacks[key] = callback
+                if self.expires is not None and self.timer is None:
+                    self.timer = threading.Timer(max(0.0, self.expires - time.monotonic()), self.cancel)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return lambda: self._unregister(key)
+        callback()
+        return lambda: None
+
+    def _unregister(self, key):
+        with self.lock:
+            self.callbacks.pop(key, None)
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """在 with 块内，令牌被取消时执行 callback。"""
+        unregister = self._register(callback)
+        try:
+            yield
+        finally:
+            unregister()
+
+    def child(self, budget=None):
+        """派生子令牌：期限为 budget 秒与父令牌剩余时间中较短者。"""
+        token = CancelToken()
+        limits = [t for t in (self.expires, time.monotonic() + budget if budget is not None else None)
+                  if t is not None]
+        token.expires = min(limits) if limits else None
+        token.detach = self._register(token.cancel)
+        return token
+
+    def split(self, share):
+        """从剩余时间中划出 share 比例作为下一阶段的期限；没有总期限时不限时。"""
+        remaining = self.remaining()
+        return self.child(None if remaining is None else remaining * share)
+
+
+class DaemonExecutor(Executor):
+    """
+    有界线程池，工作线程为守护线程，按需创建，最多 max_workers 个。
+    标准库的 ThreadPoolExecutor 在解释器退出时等待全部工作线程结束，
+    一个仍在等待响应头的请求会让进程在停止后继续存活到读取超时。
+    """
+
+    def __init__(self, max_workers, name="mihomo-io"):
+        self.max_workers = max_workers
+        self.name = name
+        self.queue = queue.SimpleQueue()
+        self.idle = threading.Semaphore(0)
+        self.lock = threading.Lock()
+        self.workers = 0
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.queue.put((future, fn, args, kwargs))
+        # 有空闲线程时由它取走任务，否则在上限内新建线程
+        if not self.idle.acquire(timeout=0):
+            with self.lock:
+                if self.workers < self.max_workers:
+                    self.workers += 1
+                    threading.Thread(target=self._work, name=f"{self.name}-{self.workers}", daemon=True).start()
+        return future
+
+    def _work(self):
+        while True:
+            future, fn, args, kwargs = self.queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            del future, fn, args, kwargs
+            self.idle.release()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def blocking_executor():
+    """返回进程内共享的有界线程池，run_in_thread() 的阻塞调用都在其中执行。"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = DaemonExecutor(BLOCKING_WORKERS)
+        return _executor
+
+
+def run_in_thread(func, *args, orphan=None):
+    """
+    在共享的守护线程池中执行阻塞调用，返回可等待的 Future。等待方取消后不再等待该调用，
+    卡住的请求不会拖慢事件循环关闭和进程退出；尚未开始执行的调用直接跳过。
+    等待方已取消或事件循环已关闭时，非空的结果交给 orphan(result) 处理（例如删除临时文件）。
+    func 在调用方的 contextvars 上下文中执行（例如当前刷新的指标记录器）。
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    context = contextvars.copy_context()
+
+    def deliver(ok, value):
+        if future.cancelled():
+            if ok and value and orphan:
+                orphan(value)
+        elif ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def worker():
+        if future.cancelled():
+            return
+        try:
+            ok, value = True, context.run(func, *args)
+        except Exception as e:
+            ok, value = False, e
+        try:
+            loop.call_soon_threadsafe(deliver, ok, value)
+        except RuntimeError:
+            # 事件循环已关闭
+            if ok and value and orphan:
+                orphan(value)
+
+    # 结果经 deliver() 交给 future，run_in_executor 返回的 Future 不再等待
+    loop.run_in_executor(blocking_executor(), worker)
+    return future
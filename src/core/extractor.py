@@ -0,0 +1,104 @@
+# refactored_mihomo/src/core/extractor.py
+from urllib.parse import urlsplit
+import re
+
+CONTEXT_CHARS = 300
+# 贪婪匹配一段连续的 URL 字符，finditer 从匹配末尾继续扫描，整体为线性时间
+URL_PATTERN = re.compile(r'https?://[^\s<>"\'()\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]+', re.IGNORECASE)
+LABEL_PATTERN = re.compile(r'clash[\s._-]?meta|mihomo', re.IGNORECASE)
+SUBSCRIBE_PATTERN = re.compile(r'订阅|地址|链接|subscribe', re.IGNORECASE)
+
+KIND_MIHOMO = "mihomo"
+KIND_CLASH_META = "clash.meta"
+KIND_UNKNOWN = "unknown"
+
+
+def _label_kind(label):
+    return KIND_MIHOMO if label.lower() == "mihomo" else KIND_CLASH_META
+
+
+class LinkCandidate:
+    """提取到的订阅链接候选，position 为其在页面中的顺序。"""
+
+    def __init__(self, url, position, before):
+        self.url = url
+        self.position = position
+        self.before = before
+        self.after = ""
+        self.kind = KIND_UNKNOWN
+        self.score = 0.0
+
+    def classify(self, trusted_prefix=None):
+        """根据链接本身和离它最近的标签文字判断类型并计算置信度；以 trusted_prefix 开头的链接加分。"""
+        url = self.url.lower()
+        labels = LABEL_PATTERN.findall(self.before)
+        trailing = LABEL_PATTERN.search(self.after)
+        if LABEL_PATTERN.search(url):
+            self.kind = _label_kind(LABEL_PATTERN.search(url).group(0))
+            self.score = 0.6
+        elif labels:
+            self.kind = _label_kind(labels[-1])
+            self.score = 0.4
+        elif trailing:
+            self.kind = _label_kind(trailing.group(0))
+            self.score = 0.2
+        if labels and _label_kind(labels[-1]) == self.kind:
+            self.score += 0.2
+        if SUBSCRIBE_PATTERN.search(self.before[-60:]):
+            self.score += 0.1
+        if trusted_prefix and url.startswith(trusted_prefix.lower()):
+            self.score += 0.1
+        self.score = round(min(self.score, 1.0), 2)
+        return self
+
+
+class MihomoLinkExtractor:
+    """
+    单遍订阅链接提取器：按文档顺序接收文本节点和 <a> 链接，
+    只保留每个链接前后各 CONTEXT_CHARS 个字符的上下文，用预编译的正则分类。
+    trusted_prefix 为来源站点存放订阅文件的目录，其中的链接置信度更高。
+    """
+
+    def __init__(self, trusted_prefix=None):
+        self.trusted_prefix = trusted_prefix
+        self.before = ""
+        self.pending = []
+        self.candidates = []
+        self.seen = set()
+
+    def _add(self, url, before, after=""):
+        url = url.rstrip(".,;:!?")
+        path = urlsplit(url).path.lower()
+        if not path.endswith((".yaml", ".yml")) or url in self.seen:
+            return
+        self.seen.add(url)
+        candidate = LinkCandidate(url, len(self.candidates), before[-CONTEXT_CHARS:])
+        candidate.after = after[:CONTEXT_CHARS]
+        self.candidates.append(candidate)
+        if len(candidate.after) < CONTEXT_CHARS:
+            self.pending.append(candidate)
+
+    def feed_text(self, text):
+        """输入一个文本节点，文本中出现的 yaml 链接也会作为候选。"""
+        if not text:
+            return
+        # 先为已有候选补充后文，再处理本节点中新出现的链接
+        if self.pending:
+            for candidate in self.pending:
+                candidate.after += text[:CONTEXT_CHARS - len(candidate.after)]
+            self.pending = [c for c in self.pending if len(c.after) < CONTEXT_CHARS]
+        for match in URL_PATTERN.finditer(text):
+            start, end = match.span()
+            self._add(match.group(0), self.before + text[max(0, start - CONTEXT_CHARS):start],
+                      text[end:end + CONTEXT_CHARS])
+        self.before = (self.before + text[-CONTEXT_CHARS:])[-CONTEXT_CHARS:]
+
+    def feed_link(self, href):
+        """输入一个 <a> 标签的 href，上下文为此前的文本。"""
+        if href and href.lower().startswith(("http://", "https://")):
+            self._add(href.strip(), self.before)
+
+    def results(self):
+        """返回按页面顺序排列、已分类并打分的全部候选。"""
+        return [candidate.classify(self.trusted_prefix) for candidate in self.candidates]
+
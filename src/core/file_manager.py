@@ -1,65 +1,310 @@
 # refactored_mihomo/src/core/file_manager.py
 import os
+import codecs
+import hashlib
+import tempfile
+import time
+from contextlib import closing
 from datetime import datetime
+from urllib.parse import urlsplit
 
+import requests
+import yaml
+
+from src.core.cancellation import CancelToken, Cancelled
+from src.core.http_client import get_default_client
+from src.core.proxy_processor import process_config, load_config, dump_config, merge_configs, drop_references
+from src.core.prober import NodeProber, apply_probe_results, PROBE_PRUNE
+from src.core.snapshots import SnapshotStore, SNAPSHOT_DIR
+from src.utils.charset import detect_charset, is_undecided
+from src.utils.validators import (is_config_content_type, iter_config_chunks, InvalidSubscription,
+                                  SubscriptionUnchanged)
 from src.utils.logger import MihomoLogger
-from src.utils.constants import SAVE_DIR
+from src.utils.metrics import current_metrics
+from src.utils.constants import (SAVE_DIR, MAX_YAML_BYTES, PROBE_ACTION,
+                                 PROBE_CONCURRENCY, PROBE_TIMEOUT)
+
+CHUNK_SIZE = 64 * 1024
 
 
 class MihomoFileManager:
-    def __init__(self, save_dir, logger):
+    def __init__(self, save_dir, logger, http_client=None, probe_action=PROBE_ACTION, metrics=None, snapshots=None):
         self.save_dir = save_dir
         self.logger = logger
+        self.http_client = http_client or get_default_client()
+        # 未指定时记入当前刷新的指标记录器
+        self.fixed_metrics = metrics
+        self.probe_action = probe_action
+        self.prober = NodeProber(PROBE_CONCURRENCY, PROBE_TIMEOUT)
+        # 每次保存的 85LA.yaml 按内容哈希压缩存入 SAVE_DIR/history
+        self.snapshots = snapshots or SnapshotStore(os.path.join(save_dir, SNAPSHOT_DIR))
+
+    @property
+    def metrics(self):
+        return self.fixed_metrics or current_metrics()
 
-    def save_subscription_url(self, yaml_url):
+    def save_subscription_url(self, yaml_url, token=None):
         """
-        修复版本：远程下载 yaml 文件内容，修复乱码并清理代理名称，然后保存为 85LA.yaml
+        流式下载 yaml 文件内容，修复乱码、清理代理名称并去重后原子写入 85LA.yaml。
         """
-        import requests
         try:
-            # 下载内容
-            resp = requests.get(yaml_url, timeout=15, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            })
-            resp.raise_for_status()
-            
-            # 尝试不同的编码方式来解决乱码问题
-            content = None
-            encodings = ['utf-8', 'gbk', 'gb2312', 'big5', 'latin1']
-            
-            for encoding in encodings:
-                try:
-                    resp.encoding = encoding
-                    test_content = resp.text
-                    # 验证内容是否包含有效的YAML结构且不包含过多乱码
-                    if ('proxies:' in test_content or 'proxy-groups:' in test_content):
-                        # 简单检查乱码程度 - 如果包含过多非ASCII字符可能是编码错误
-                        ascii_ratio = sum(1 for c in test_content[:1000] if ord(c) < 128) / min(1000, len(test_content))
-                        if ascii_ratio > 0.6 or encoding == 'utf-8':  # utf-8优先
-                            content = test_content
-                            self.logger.log(f"使用 {encoding} 编码解析成功", "INFO")
-                            break
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
-            
-            # 如果所有编码都失败，使用默认处理
-            if not content:
-                content = resp.content.decode('utf-8', errors='replace')
-                self.logger.log("使用默认UTF-8编码（替换错误字符）", "WARN")
-            
-            # 保存文件
-            save_path = os.path.join(self.save_dir, "85LA.yaml")
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-            with open(save_path, "w", encoding="utf-8", errors='replace') as f:
-                f.write(content)
-            
-            self.logger.log(f"✅ 已下载节点配置到 {save_path}", "SUCCESS")
-            return True
-            
+            tmp_path = self.fetch_subscription(yaml_url, token)
+        except InvalidSubscription:
+            self.logger.log(f"❌ 下载处理 yaml 失败：{yaml_url} 不是有效的 Mihomo 配置", "ERROR")
+            return False
+        if tmp_path is None:
+            # 网络错误、非 200 状态码或已取消等暂时性失败
+            self.logger.log(f"❌ 下载 yaml 失败：{yaml_url}", "ERROR")
+            return False
+        return self.save_prefetched(tmp_path, token, yaml_url)
+
+    def fetch_subscription(self, yaml_url, token=None, on_first_byte=None, known_digest=None):
+        """
+        验证与下载合并为一次流式 GET：检查 Content-Type，并在第一个数据块中确认顶层有
+        proxies / proxy-groups，不符合时立即中止；符合时把完整内容写入临时文件并返回其路径。
+        响应确定不是 Mihomo 配置时抛出 InvalidSubscription；网络错误、非 200 状态码或 token 被取消等
+        暂时性失败返回 None。返回的临时文件由 save_prefetched() 或 discard() 处理。
+        收到响应头后调用 on_first_byte()，供对冲请求判断镜像是否已经响应。
+        known_digest 为上次保存的订阅内容哈希：服务器返回 304 且缓存内容的哈希与之相同时，
+        不解码也不写临时文件，直接抛出 SubscriptionUnchanged。
+        """
+        token = token or CancelToken()
+        try:
+            token.raise_if_cancelled()
+            with self.metrics.span("validate"):
+                resp = self.http_client.get_cached(yaml_url, stream=True,
+                                                   timeout=token.timeout(self.http_client.split_timeout()))
+            with resp:
+                if on_first_byte:
+                    on_first_byte()
+                content_type = resp.headers.get("Content-Type")
+                if resp.status_code != 200 or not is_config_content_type(content_type):
+                    # 不读取响应体，也不写入 HTTP 缓存
+                    if getattr(resp, "cache_writer", None):
+                        resp.cache_writer.abort()
+                    if resp.status_code == 200:
+                        raise InvalidSubscription(f"Content-Type 为 {content_type}")
+                    return None
+                if known_digest and resp.from_cache and getattr(resp, "cache_digest", None) == known_digest:
+                    raise SubscriptionUnchanged(yaml_url)
+                tmp_path, digest = self.stream_to_temp(resp, self.save_dir, sniff=True, token=token)
+                if self.http_client.cache is not None:
+                    # 下次 304 时据此判断内容是否与已保存的相同
+                    self.http_client.cache.annotate(yaml_url, resp.headers, digest)
+                return tmp_path
+        except Cancelled:
+            return None
+        except (InvalidSubscription, SubscriptionUnchanged):
+            raise
+        except (requests.RequestException, ValueError, OSError) as e:
+            self.logger.log(f"下载 {yaml_url} 失败：{e}", "INFO")
+            return None
+
+    def save_prefetched(self, tmp_path, token=None, source_url=None):
+        """清理已下载的临时文件中的节点后原子替换 85LA.yaml，source_url 记入历史快照。"""
+        save_path = self.get_yaml_file_path()
+        try:
+            with self.metrics.span("save"):
+                nodes = self.clean_proxies(tmp_path, token)
+                if token is not None:
+                    token.raise_if_cancelled()
+                changed = self.install(tmp_path, save_path, source_url, nodes)
+        except Cancelled as e:
+            self.discard(tmp_path)
+            self.logger.log(f"保存中止（{e}），保留原有的 {save_path}", "WARN")
+            return False
         except Exception as e:
+            self.discard(tmp_path)
             self.logger.log(f"❌ 下载处理 yaml 失败：{e}", "ERROR")
             return False
+        self._log_saved(save_path, changed)
+        return True
+
+    def _log_saved(self, save_path, changed):
+        if changed:
+            self.logger.log(f"✅ 已下载节点配置到 {save_path}", "SUCCESS")
+        else:
+            self.logger.log(f"✅ 节点配置没有变化，保留现有的 {save_path}", "SUCCESS")
+
+    def save_merged_subscription(self, downloads, token=None):
+        """
+        合并多个已下载的订阅（[(链接, 临时文件路径), ...]，按优先级排列），节点去重后原子写入一个 85LA.yaml。
+        临时文件无论成败都会被删除。
+        """
+        save_path = self.get_yaml_file_path()
+        configs, sources = [], []
+        for url, tmp_path in downloads:
+            try:
+                config = load_config(tmp_path)
+            except (yaml.YAMLError, UnicodeDecodeError) as e:
+                self.logger.log(f"配置解析失败，已跳过：{url}（{e}）", "WARN")
+                continue
+            finally:
+                self.discard(tmp_path)
+            if config is None:
+                self.logger.log(f"内容不是有效的 Mihomo 配置，已跳过：{url}", "WARN")
+            else:
+                configs.append(config)
+                sources.append(url)
+        if not configs:
+            self.logger.log("❌ 没有可合并的订阅内容", "ERROR")
+            return False
+
+        try:
+            with self.metrics.span("save"):
+                total, kept = merge_configs(configs)
+                self.probe_proxies(configs[0], token)
+                if token is not None:
+                    token.raise_if_cancelled()
+                changed = self.write_config(configs[0], save_path, " + ".join(sources))
+        except Cancelled as e:
+            self.logger.log(f"保存中止（{e}），保留原有的 {save_path}", "WARN")
+            return False
+        except Exception as e:
+            self.logger.log(f"❌ 保存合并配置失败：{e}", "ERROR")
+            return False
+        self.logger.log(f"合并 {len(configs)} 个订阅，共 {total} 个节点，去重后保留 {kept} 个", "INFO")
+        self._log_saved(save_path, changed)
+        return True
+
+    def write_config(self, config, save_path, source_url=None):
+        """把配置写入同目录的临时文件后原子替换 save_path，返回文件是否有变化。"""
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".85LA.", suffix=".tmp", dir=os.path.dirname(save_path))
+        os.close(fd)
+        try:
+            dump_config(config, tmp_path)
+            return self.install(tmp_path, save_path, source_url, len(config["proxies"]))
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+
+    def install(self, tmp_path, save_path, source_url=None, nodes=None):
+        """
+        用临时文件原子替换 save_path 并记入历史快照，返回文件是否有变化。
+        内容与现有文件完全相同时不替换，只删除临时文件，监视该文件的程序不会被唤醒。
+        """
+        digest = self.content_hash(tmp_path)
+        if os.path.isfile(save_path) and os.path.getsize(save_path) == os.path.getsize(tmp_path) \
+                and self.content_hash(save_path) == digest:
+            self.discard(tmp_path)
+            changed = False
+        else:
+            os.replace(tmp_path, save_path)
+            changed = True
+        try:
+            self.snapshots.add(save_path, digest, source_url, nodes)
+        except OSError as e:
+            self.logger.log(f"保存历史快照失败：{e}", "WARN")
+        return changed
+
+    def stream_to_temp(self, resp, save_dir, sniff=False, token=None):
+        """
+        逐块解码响应体并以 UTF-8 写入 save_dir 下的临时文件（已 fsync），返回 (临时文件路径, 内容哈希)，
+        哈希与 content_hash(临时文件路径) 相同。
+        下载阶段的内存占用只与块大小有关；之后的 clean_proxies() 仍需把整个配置载入内存。
+        sniff 为 True 时开头不像 Mihomo 配置则中止读取并抛出 InvalidSubscription；token 被取消时抛出 Cancelled。
+        下载和解码分别记入 download / decode 阶段的指标。
+        """
+        os.makedirs(save_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".85LA.", suffix=".tmp", dir=save_dir)
+        decode_seconds, decoded_bytes = 0.0, 0
+        digest = hashlib.sha256()
+        try:
+            chunks = self.http_client.iter_body(resp, CHUNK_SIZE, MAX_YAML_BYTES, token)
+            with self.metrics.span("download") as span, closing(chunks), os.fdopen(fd, "wb") as f:
+                decoder = None
+                for chunk in iter_config_chunks(chunks) if sniff else chunks:
+                    span.bytes += len(chunk)
+                    started = time.perf_counter()
+                    if decoder is None and is_undecided(chunk, resp.headers.get("Content-Type")):
+                        # 开头的纯 ASCII 数据块在各候选编码下结果相同，直接写出
+                        data = chunk
+                    else:
+                        if decoder is None:
+                            # 用第一个含非 ASCII 字节的数据块识别编码，之后增量解码，整个文件只解码一次
+                            encoding = detect_charset(chunk, resp.headers.get("Content-Type"),
+                                                      urlsplit(resp.url or "").hostname)
+                            self.logger.log(f"使用 {encoding} 编码解析", "INFO")
+                            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                        data = decoder.decode(chunk).encode("utf-8", errors="replace")
+                    decode_seconds += time.perf_counter() - started
+                    decoded_bytes += len(chunk)
+                    digest.update(data)
+                    f.write(data)
+                if decoder is not None:
+                    data = decoder.decode(b"", final=True).encode("utf-8", errors="replace")
+                    digest.update(data)
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        finally:
+            if decoded_bytes:
+                self.metrics.add("decode", decode_seconds, decoded_bytes)
+        return tmp_path, digest.hexdigest()
+
+    @staticmethod
+    def content_hash(path):
+        """文件内容的 SHA-256，用于判断订阅内容是否变化。"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def discard(tmp_path):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def clean_proxies(self, path, token=None):
+        """
+        下载后的处理阶段：规范化节点名称、去掉重复节点并同步更新 proxy-groups，
+        启用探测时再剔除或排序节点（整个配置会被载入内存）。返回保留的节点数；内容不是有效的 Mihomo 配置时保持原样并返回 None。
+        """
+        try:
+            config = load_config(path)
+        except (yaml.YAMLError, UnicodeDecodeError) as e:
+            self.logger.log(f"配置解析失败，保留原始内容：{e}", "WARN")
+            return None
+        if config is None:
+            self.logger.log("未找到 proxies 列表，保留原始内容", "WARN")
+            return None
+        total, kept = process_config(config)
+        self.logger.log(f"共 {total} 个节点，去重后保留 {kept} 个", "INFO")
+        self.probe_proxies(config, token)
+        dump_config(config, path)
+        return len(config["proxies"])
+
+    def probe_proxies(self, config, token=None):
+        """
+        探测节点连通性，按 probe_action 剔除不可用节点或按延迟排序；未启用时不做任何事。
+        token 的剩余时间不足一轮探测时跳过探测；探测中途被取消时抛出 Cancelled。
+        """
+        if not self.probe_action:
+            return
+        if token is not None:
+            token.raise_if_cancelled()
+            remaining = token.remaining()
+            if remaining is not None and remaining < self.prober.timeout:
+                self.logger.log("剩余时间不足，跳过连通性探测", "WARN")
+                return
+        proxies = config["proxies"]
+        results = self.prober.run(proxies, token)
+        alive = [r for r in results if r.latency is not None]
+        if not alive:
+            self.logger.log("没有节点通过连通性探测（可能是本机网络问题），保留全部节点", "WARN")
+            return
+        fastest = min(r.latency for r in alive)
+        self.logger.log(f"连通性探测：{len(alive)}/{len(results)} 个节点可用，最低延迟 {fastest:.0f} ms", "INFO")
+        config["proxies"] = apply_probe_results(proxies, results, self.probe_action)
+        if self.probe_action == PROBE_PRUNE:
+            drop_references(config, [r.name for r in results if not r.alive])
 
     def get_yaml_file_path(self):
         return os.path.join(self.save_dir, "85LA.yaml")
@@ -0,0 +1,91 @@
+# refactored_mihomo/src/core/host_health.py
+import math
+import threading
+import time
+from collections import deque
+
+import requests
+
+from src.utils.constants import (BREAKER_THRESHOLD, BREAKER_COOLDOWN, HEDGE_DEFAULT_DELAY,
+                                 HEDGE_MIN_DELAY, HEDGE_MAX_DELAY)
+
+# 计算对冲延迟所用的首字节耗时样本数，以及开始使用 p95 前至少需要的样本数
+TTFB_SAMPLES = 64
+TTFB_MIN_SAMPLES = 5
+
+
+class CircuitOpen(requests.ConnectionError):
+    """主机的熔断器处于打开状态，请求未发出。"""
+
+
+class HostHealth:
+    """
+    按主机记录连接健康状况的熔断器：连续失败 threshold 次后在 cooldown 秒内不再请求该主机，
+    冷却结束后放行请求试探，成功即恢复、失败则再次熔断。状态写入状态库，跨运行保留。
+    同时统计最近的首字节耗时，用其 p95 作为对冲请求的等待时间。
+    """
+
+    def __init__(self, state_store=None, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.state_store = state_store
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.samples = deque(maxlen=TTFB_SAMPLES)
+        self.lock = threading.Lock()
+
+    def _state(self, host):
+        """返回主机的 [连续失败次数, 熔断截止时间]，首次访问时从状态库读取（调用方持有锁）。"""
+        state = self.hosts.get(host)
+        if state is None:
+            record = self.state_store.get_host(host) if self.state_store is not None else None
+            state = self.hosts[host] = list(record) if record else [0, 0.0]
+        return state
+
+    def allow(self, host):
+        with self.lock:
+            return self._state(host)[1] <= time.time()
+
+    def retry_after(self, host):
+        """熔断剩余的秒数，未熔断时为 0。"""
+        with self.lock:
+            return max(0.0, self._state(host)[1] - time.time())
+
+    def check(self, host):
+        """熔断中的主机抛出 CircuitOpen。"""
+        wait = self.retry_after(host)
+        if wait > 0:
+            raise CircuitOpen(f"{host} 近期连续失败，{math.ceil(wait)} 秒内跳过")
+
+    def record_success(self, host, ttfb=None):
+        with self.lock:
+            state = self._state(host)
+            changed = state != [0, 0.0]
+            state[:] = [0, 0.0]
+            if ttfb is not None:
+                self.samples.append(ttfb)
+        if changed:
+            self._save(host, state)
+
+    def record_failure(self, host):
+        """记录一次失败，返回熔断器是否因此打开。"""
+        with self.lock:
+            state = self._state(host)
+            state[0] += 1
+            opened = state[0] >= self.threshold
+            if opened:
+                state[1] = time.time() + self.cooldown
+        self._save(host, state)
+        return opened
+
+    def _save(self, host, state):
+        if self.state_store is not None:
+            self.state_store.put_host(host, state[0], state[1])
+
+    def hedge_delay(self):
+        """对冲等待时间：最近首字节耗时的 p95，限制在 [HEDGE_MIN_DELAY, HEDGE_MAX_DELAY] 之间。"""
+        with self.lock:
+            samples = sorted(self.samples)
+        if len(samples) < TTFB_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        p95 = samples[min(len(samples) - 1, math.ceil(len(samples) * 0.95) - 1)]
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
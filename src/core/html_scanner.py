@@ -0,0 +1,117 @@
+# refactored_mihomo/src/core/html_scanner.py
+from html.parser import HTMLParser
+
+from src.core.extractor import MihomoLinkExtractor
+
+HEADING_TAGS = ("h2", "h3", "article")
+CONTENT_CLASSES = ("entry-content", "post-content", "article-content", "single-content")
+SKIPPED_TAGS = ("script", "style", "noscript")
+
+
+def _has_class(attrs, names):
+    return any(name in names for name in (attrs.get("class") or "").split())
+
+
+class HomepageScanner(HTMLParser):
+    """
+    增量扫描首页：只收集文章标题元素（class 属于 heading_classes）的文字和其中第一个链接，其余内容直接丢弃。
+    on_heading(标题, 链接) 返回真值时置 done，调用方即可断开连接。
+    """
+
+    def __init__(self, on_heading, heading_classes):
+        super().__init__(convert_charrefs=True)
+        self.on_heading = on_heading
+        self.heading_classes = heading_classes
+        self.done = False
+        self.heading_tag = None
+        self.depth = 0
+        self.texts = []
+        self.href = None
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.heading_tag:
+            if tag == self.heading_tag:
+                self.depth += 1
+            if tag == "a" and self.href is None:
+                self.href = attrs.get("href")
+        elif tag in HEADING_TAGS and _has_class(attrs, self.heading_classes):
+            self.heading_tag = tag
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.heading_tag != tag:
+            return
+        self.depth -= 1
+        if self.depth:
+            return
+        title = "".join(text.strip() for text in self.texts)
+        href = self.href
+        self.heading_tag, self.texts, self.href = None, [], None
+        if self.on_heading(title, href):
+            self.done = True
+
+    def handle_data(self, data):
+        if self.heading_tag:
+            self.texts.append(data)
+
+
+class PostScanner(HTMLParser):
+    """
+    增量扫描文章页：把正文容器内的文本节点和链接交给 MihomoLinkExtractor，
+    正文容器结束即置 done；页面没有可识别的正文容器时退回整页提取。
+    """
+
+    def __init__(self, trusted_prefix=None):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self.content = MihomoLinkExtractor(trusted_prefix)
+        self.page = MihomoLinkExtractor(trusted_prefix)
+        self.found_root = False
+        self.root_tag = None
+        self.depth = 0
+        self.skipping = 0
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    @property
+    def target(self):
+        return self.content if self.found_root else self.page
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+            return
+        attrs = dict(attrs)
+        if self.root_tag:
+            if tag == self.root_tag:
+                self.depth += 1
+        elif not self.found_root and _has_class(attrs, CONTENT_CLASSES):
+            self.found_root = True
+            self.root_tag = tag
+            self.depth = 1
+        if tag == "a":
+            self.target.feed_link(attrs.get("href"))
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag == self.root_tag:
+            self.depth -= 1
+            if self.depth == 0:
+                self.root_tag = None
+                self.done = True
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.target.feed_text(data)
+
+    def results(self):
+        return self.target.results()
+
@@ -0,0 +1,196 @@
+# refactored_mihomo/src/core/http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from src.utils.constants import HTTP_CACHE_MAX_BYTES
+
+# 需要随响应体一起保存的响应头
+CACHED_HEADERS = ("ETag", "Last-Modified", "Content-Type")
+
+
+class HttpCache:
+    """
+    持久化的 HTTP 缓存：保存响应体及 ETag/Last-Modified，用于条件重验证；
+    总大小超过 max_bytes 时按最近最少使用（LRU）淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + ".body")
+
+    def conditional_headers(self, url):
+        """返回用于重验证的 If-None-Match / If-Modified-Since 请求头。"""
+        with self.lock:
+            entry = self.index.get(self._key(url))
+        if not entry or not os.path.isfile(self._body_path(self._key(url))):
+            return {}
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    @staticmethod
+    def _cacheable_headers(headers):
+        kept = {name: headers[name] for name in CACHED_HEADERS if headers.get(name)}
+        if "ETag" not in kept and "Last-Modified" not in kept:
+            return None
+        return kept
+
+    def store(self, url, headers, body):
+        """保存响应；没有任何校验头的响应无法重验证，不缓存。"""
+        writer = self.open_writer(url, headers)
+        if writer:
+            writer.write(body)
+            writer.commit()
+
+    def open_writer(self, url, headers):
+        """为流式响应打开一个缓存写入器，响应不可缓存时返回 None。"""
+        kept = self._cacheable_headers(headers)
+        if kept is None:
+            return None
+        return CacheWriter(self, url, kept)
+
+    def _commit(self, url, headers, tmp_path, size):
+        key = self._key(url)
+        os.replace(tmp_path, self._body_path(key))
+        with self.lock:
+            self.index[key] = {"url": url, "headers": headers, "size": size, "last_used": time.time()}
+            self._evict()
+            self._save_index()
+
+    def annotate(self, url, headers, digest):
+        """记录缓存内容解码后的哈希（resp.cache_digest）；缓存已被更新（校验头不同）时忽略。"""
+        key = self._key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or entry["headers"] != self._cacheable_headers(headers):
+                return
+            entry["digest"] = digest
+            self._save_index()
+
+    def response(self, url):
+        """
+        用缓存内容构造一个 200 响应（resp.from_cache 为 True），缓存缺失时返回 None。
+        resp.cache_digest 为 annotate() 记录的哈希，没有记录时为 None。
+        """
+        key = self._key(url)
+        with self.lock:
+            entry = self.index.get(key)
+        if not entry:
+            return None
+        try:
+            with open(self._body_path(key), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self.lock:
+                self.index.pop(key, None)
+            return None
+        with self.lock:
+            entry["last_used"] = time.time()
+            self._save_index()
+        resp = Response()
+        resp.status_code = 200
+        resp.reason = "OK"
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = body
+        resp._content_consumed = True
+        resp.from_cache = True
+        resp.cache_digest = entry.get("digest")
+        return resp
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            del self.index[key]
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+
+
+class CacheWriter:
+    """
+    边下载边写入缓存的临时文件，commit() 时才替换正式缓存；超过缓存容量时自动放弃。
+    临时文件在第一次写入时才创建，响应体未被读取时不占用文件句柄。
+    """
+
+    def __init__(self, cache, url, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.tmp_path = cache._body_path(cache._key(url)) + ".%d.tmp" % threading.get_ident()
+        self.file = None
+        self.size = 0
+        self.committed = False
+        self.aborted = False
+
+    def _open(self):
+        if self.file is None and not self.aborted:
+            self.file = open(self.tmp_path, "wb")
+        return self.file
+
+    def write(self, chunk):
+        if self._open() is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_bytes:
+            self.abort()
+            return
+        self.file.write(chunk)
+
+    def commit(self):
+        if self._open() is None:
+            return
+        self.file.close()
+        self.file = None
+        self.cache._commit(self.url, self.headers, self.tmp_path, self.size)
+        self.committed = True
+
+    def abort(self):
+        if self.aborted or self.committed:
+            return
+        self.aborted = True
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,153 @@
+# refactored_mihomo/src/core/http_client.py
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.core.cancellation import CancelToken
+from src.core.host_health import HostHealth
+
+from src.utils.constants import TIMEOUT, CONNECT_TIMEOUT, POOL_MAXSIZE
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+
+class MihomoHttpClient:
+    """
+    共享的 HTTP 客户端：复用 keep-alive 连接池，统一设置请求头和连接/读取超时。
+    get_cached() 经过按主机的熔断器，并把首字节耗时记入 health，供对冲请求使用。
+    """
+
+    def __init__(self, timeout=TIMEOUT, connect_timeout=CONNECT_TIMEOUT, pool_size=POOL_MAXSIZE, headers=None,
+                 cache=None, health=None):
+        self.cache = cache
+        self.health = health or HostHealth()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        # pool_connections: 缓存的主机连接池数量；pool_maxsize: 每个主机保留的连接数
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def split_timeout(self, read_timeout=None):
+        """返回 (连接超时, 读取超时) 元组，供 requests 使用。"""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.split_timeout())
+        return self.session.get(url, **kwargs)
+
+    def get_cached(self, url, **kwargs):
+        """
+        经过 HTTP 缓存的 GET：带上 If-None-Match / If-Modified-Since 重验证，
+        服务器返回 304 时直接用缓存内容构造响应。返回的 resp.from_cache 标记是否命中缓存。
+        主机处于熔断状态时不发请求，直接抛出 CircuitOpen；连接失败、超时和 5xx 计为该主机的失败。
+        """
+        host = urlsplit(url).hostname or ''
+        self.health.check(host)
+        try:
+            resp = self._get_cached(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.health.record_failure(host)
+            raise
+        if resp.status_code >= 500:
+            self.health.record_failure(host)
+        else:
+            self.health.record_success(host, None if resp.from_cache else resp.elapsed.total_seconds())
+        return resp
+
+    def _get_cached(self, url, **kwargs):
+        if self.cache is None:
+            resp = self.get(url, **kwargs)
+            resp.from_cache = False
+            return resp
+        headers = dict(kwargs.pop('headers', None) or {})
+        resp = self.get(url, headers={**headers, **self.cache.conditional_headers(url)}, **kwargs)
+        if resp.status_code == 304:
+            cached = self.cache.response(url)
+            if cached is not None:
+                return cached
+            # 缓存体已丢失，去掉条件头重新完整请求
+            resp = self.get(url, headers=headers, **kwargs)
+        if resp.status_code == 200:
+            if kwargs.get('stream'):
+                # 流式响应在 iter_body() 读取时同步写入缓存
+                resp.cache_writer = self.cache.open_writer(url, resp.headers)
+            else:
+                self.cache.store(url, resp.headers, resp.content)
+        resp.from_cache = False
+        return resp
+
+    @classmethod
+    def iter_body(cls, resp, chunk_size, max_bytes=None, token=None):
+        """
+        逐块读取响应体，累计超过 max_bytes 时抛出 ValueError；
+        对可缓存的流式响应同时把数据写入 HTTP 缓存。
+        token 被取消时立即中止读取（包括阻塞中的读取）并抛出 Cancelled。
+        """
+        token = token or CancelToken()
+        writer = getattr(resp, 'cache_writer', None)
+        received = 0
+        try:
+            length = resp.headers.get('Content-Length', '')
+            if max_bytes and length.isdigit() and int(length) > max_bytes:
+                raise ValueError(f"响应体大小 {length} 字节超过上限 {max_bytes} 字节")
+            with token.on_cancel(lambda: cls.abort(resp)):
+                try:
+                    for chunk in resp.iter_content(chunk_size):
+                        token.raise_if_cancelled()
+                        received += len(chunk)
+                        if max_bytes and received > max_bytes:
+                            raise ValueError(f"响应体超过上限 {max_bytes} 字节")
+                        if writer:
+                            writer.write(chunk)
+                        yield chunk
+                except requests.RequestException:
+                    # 被中止的读取表现为连接错误
+                    token.raise_if_cancelled()
+                    raise
+                # 连接被关闭时读取也可能正常结束，此时内容并不完整
+                token.raise_if_cancelled()
+            if writer:
+                writer.commit()
+        finally:
+            if writer and not writer.committed:
+                writer.abort()
+
+    @staticmethod
+    def abort(resp):
+        """从其他线程中止响应：关闭底层 socket，使阻塞中的读取立即返回。"""
+        sock = getattr(getattr(resp.raw, '_connection', None), 'sock', None)
+        if sock is None:
+            # Connection: close 和 HTTP/1.0 的响应不再关联连接对象，从 http.client 的文件对象取 socket
+            fp = getattr(getattr(resp.raw, '_fp', None), 'fp', None)
+            sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client():
+    """返回进程内共享的默认客户端，供未显式注入客户端的调用方使用。"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = MihomoHttpClient()
+        return _default_client
@@ -0,0 +1,78 @@
+# refactored_mihomo/src/core/line_index.py
+import os
+import mmap
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+
+
+class LineIndex:
+    """
+    基于内存映射的只读行索引：扫描一次文件记录每行的起始偏移，之后按行号随机读取、按内容搜索。
+    只在读取/搜索期间映射文件，不长期占用文件句柄，文件可以随时被原子替换。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = array('Q', [0])
+        self.size = 0
+        self.mtime = None
+        self.rebuild()
+
+    @contextmanager
+    def _mapped(self):
+        with open(self.path, 'rb') as f:
+            if self.size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def rebuild(self):
+        """重新扫描文件，建立行偏移索引。"""
+        stat = os.stat(self.path)
+        self.size, self.mtime = stat.st_size, stat.st_mtime_ns
+        offsets = array('Q', [0])
+        with self._mapped() as mm:
+            pos = mm.find(b'\n')
+            while pos != -1:
+                offsets.append(pos + 1)
+                pos = mm.find(b'\n', pos + 1)
+        if len(offsets) > 1 and offsets[-1] == self.size:
+            offsets.pop()  # 以换行结尾时不计最后的空行
+        self.offsets = offsets
+
+    def is_stale(self):
+        """文件在建立索引后是否被修改或替换。"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_size, stat.st_mtime_ns) != (self.size, self.mtime)
+
+    def __len__(self):
+        return len(self.offsets) if self.size else 0
+
+    def lines(self, start, count):
+        """返回从第 start 行（0 起）开始的最多 count 行文本。"""
+        end = min(len(self), start + count)
+        result = []
+        with self._mapped() as mm:
+            for i in range(max(0, start), end):
+                stop = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.size
+                result.append(mm[self.offsets[i]:stop].rstrip(b'\r\n').decode('utf-8', errors='replace'))
+        return result
+
+    def search(self, text, start_line=0):
+        """从 start_line 开始查找 text 所在的行号，到末尾后从头继续；找不到返回 -1。"""
+        if not text or not len(self):
+            return -1
+        needle = text.encode('utf-8')
+        start_line = min(max(0, start_line), len(self) - 1)
+        with self._mapped() as mm:
+            pos = mm.find(needle, self.offsets[start_line])
+            if pos == -1 and start_line:
+                pos = mm.find(needle, 0)
+        if pos == -1:
+            return -1
+        return bisect_right(self.offsets, pos) - 1
@@ -1,145 +1,244 @@
 # refactored_mihomo/src/core/network.py
-import re
-import time
+import codecs
 import requests
-from bs4 import BeautifulSoup
+from contextlib import closing
 from datetime import datetime
+from urllib.parse import urlsplit
 
+from src.core.cancellation import CancelToken, Cancelled
+from src.core.extractor import KIND_MIHOMO, KIND_UNKNOWN
+from src.core.host_health import CircuitOpen
+from src.core.html_scanner import HomepageScanner, PostScanner
+from src.core.http_client import get_default_client
+from src.utils.charset import detect_charset, is_undecided
 from src.utils.constants import BASE_URL, TIMEOUT, RETRY
 from src.utils.logger import MihomoLogger
-from src.utils.validators import validate_yaml_url
+from src.utils.metrics import current_metrics
+
+SCAN_CHUNK_SIZE = 16 * 1024
+# 扫描提前结束后，不超过该大小的可缓存页面仍读完剩余部分写入 HTTP 缓存，供下次条件请求重验证
+SCAN_DRAIN_BYTES = 512 * 1024
 
 
 class MihomoNetwork:
-    def __init__(self, base_url, timeout, retry, logger, is_running_func):
+    def __init__(self, base_url, timeout, retry, logger, is_running_func, http_client=None, state_store=None,
+                 metrics=None):
         self.base_url = base_url
         self.timeout = timeout
         self.retry = retry
         self.logger = logger
         self.is_running = is_running_func
+        self.http_client = http_client or get_default_client()
+        # 未指定时记入当前刷新的指标记录器
+        self.fixed_metrics = metrics
+        # 解析结果按 (类型, URL, ETag, Last-Modified) 记忆，304 命中缓存时跳过重复解析
+        self.parsed = {}
+        # 跨运行的 日期 -> 文章、文章 -> 订阅链接 记录，命中时不再请求网络
+        self.state_store = state_store
+
+    @property
+    def metrics(self):
+        return self.fixed_metrics or current_metrics()
 
-    def make_request(self, url, retries=None):
+    def make_request(self, url, retries=None, stage="fetch", token=None):
         """
         封装的HTTP GET请求方法，包含重试和超时逻辑。
+        只读取响应头，响应体交给 scan_response() 逐块处理。
+        超时不超过 token 的剩余时间，退避等待可被取消打断；token 被取消时抛出 Cancelled。
+        耗时和重试次数记入 stage 阶段的指标。
         """
         if retries is None:
             retries = self.retry
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        }
-        for attempt in range(retries):
-            if not self.is_running():
-                return None
-            try:
-                resp = requests.get(url, timeout=self.timeout, headers=headers)
-                resp.raise_for_status()
-                # Try multiple encodings to handle potential encoding issues
-                encodings = ['utf-8', 'gbk', 'gb2312']
-                for encoding in encodings:
-                    try:
-                        resp.encoding = encoding
-                        content = resp.text
-                        if 'qzdy-title' in content:  # Check if content seems valid
-                            return resp
-                    except UnicodeDecodeError:
-                        continue
-                # Fallback to utf-8 with replacement
-                resp.encoding = 'utf-8'
-                return resp
-            except requests.RequestException as e:
-                self.logger.log(f"请求失败 (尝试 {attempt + 1}/{retries}): {e}", "WARN")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
-        return None
+        token = token or CancelToken()
+        with self.metrics.span(stage) as span:
+            for attempt in range(retries):
+                span.retries = attempt
+                if not self.is_running():
+                    return None
+                token.raise_if_cancelled()
+                try:
+                    timeout = token.timeout(self.http_client.split_timeout(self.timeout))
+                    resp = self.http_client.get_cached(url, stream=True, timeout=timeout)
+                    resp.raise_for_status()
+                    return resp
+                except CircuitOpen as e:
+                    # 主机近期连续失败，不再重试
+                    self.logger.log(f"⛔ {e}", "WARN")
+                    break
+                except requests.RequestException as e:
+                    self.logger.log(f"请求失败 (尝试 {attempt + 1}/{retries}): {e}", "WARN")
+                    if attempt < retries - 1 and token.wait(2 ** attempt):
+                        token.raise_if_cancelled()
+            span.error = True
+            return None
 
     @staticmethod
-    def get_date_formats(target_date):
-        """返回可能的日期格式列表，用于匹配文章标题."""
-        return [
-            f"{target_date.year}年{target_date.month}月{target_date.day}日",
-            f"{target_date.year}/{target_date.month}/{target_date.day}",
-            f"{target_date.year}-{target_date.month:02d}-{target_date.day:02d}",
-            target_date.strftime("%Y年%m月%d日"),
-            f"{target_date.year}.{target_date.month}.{target_date.day}",
-            f"{target_date.year}.{target_date.month:02d}.{target_date.day:02d}",
-        ]
-
-    def find_post_by_date(self, target_date):
+    def _parse_key(kind, url, resp):
+        validators = (resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+        return (kind, url) + validators if any(validators) else None
+
+    def recall_parsed(self, kind, url, resp):
+        """响应来自缓存且内容未变时，返回上次的解析结果；否则返回 None。"""
+        key = self._parse_key(kind, url, resp)
+        if key is None or not getattr(resp, 'from_cache', False):
+            return None
+        return self.parsed.get(key)
+
+    def remember_parsed(self, kind, url, resp, result):
+        key = self._parse_key(kind, url, resp)
+        if key is not None:
+            if len(self.parsed) >= 64:
+                self.parsed.clear()
+            self.parsed[key] = result
+
+    def scan_response(self, resp, scanner, stage="parse", token=None):
+        """
+        逐块解码响应体并交给增量 HTML 扫描器；scanner.done 为真时停止解析并关闭连接
+        （可缓存的小页面先读完剩余部分写入缓存）。返回 True 表示页面被完整解析，False 表示提前结束；
+        token 被取消时抛出 Cancelled。
+        读取和解析的耗时、字节数记入 stage 阶段。
         """
-        在首页查找指定日期的文章链接。
+        chunks = self.http_client.iter_body(resp, SCAN_CHUNK_SIZE, token=token)
+        with self.metrics.span(stage) as span, resp, closing(chunks):
+            decoder = None
+            for chunk in chunks:
+                span.bytes += len(chunk)
+                if decoder is None and is_undecided(chunk, resp.headers.get('Content-Type')):
+                    # 开头的纯 ASCII 数据块在各候选编码下结果相同，等到含非 ASCII 字节的数据块再识别编码
+                    scanner.feed(chunk.decode('ascii'))
+                else:
+                    if decoder is None:
+                        encoding = detect_charset(chunk, resp.headers.get('Content-Type'),
+                                                  urlsplit(resp.url or '').hostname)
+                        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    scanner.feed(decoder.decode(chunk))
+                if scanner.done:
+                    self._drain_to_cache(resp, chunks, span)
+                    return False
+            if decoder is not None:
+                scanner.feed(decoder.decode(b'', final=True))
+            scanner.close()
+            return True
+
+    @staticmethod
+    def _drain_to_cache(resp, chunks, span):
+        """读完可缓存响应的剩余部分（不解析），使其写入 HTTP 缓存；超过 SCAN_DRAIN_BYTES 时放弃。"""
+        if getattr(resp, 'cache_writer', None) is None:
+            return
+        length = resp.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > SCAN_DRAIN_BYTES:
+            return
+        for chunk in chunks:
+            span.bytes += len(chunk)
+            if span.bytes > SCAN_DRAIN_BYTES:
+                return
+
+    def build_homepage_index(self, stop_date, heading_classes, post_date, token=None):
         """
+        流式抓取并解析一次首页，返回 {发布日期: 文章链接} 索引；失败或被取消时返回 None。
+        站点相关的规则由订阅来源提供：heading_classes 为文章标题元素的 class，
+        post_date(标题) 在标题属于节点文章时返回其发布日期，否则返回 None。
+        读到 stop_date 当天或更早的文章后即停止解析首页剩余部分。
+        索引按 stop_date 记忆，首页未变化（304）时直接复用。
+        """
+        stop_day = stop_date.date() if isinstance(stop_date, datetime) else stop_date
+        # 提前结束的索引只包含 stop_day 之后的文章，记忆时区分 stop_day
+        kind = f"homepage:{stop_day}"
         try:
-            resp = self.make_request(self.base_url)
+            resp = self.make_request(self.base_url, stage="homepage_fetch", token=token)
             if not resp:
                 self.logger.log("无法获取首页内容", "ERROR")
                 return None
-            soup = BeautifulSoup(resp.text, "html.parser")
-            date_formats = self.get_date_formats(target_date)
-            for article in soup.find_all(["h2", "h3", "article"], class_=["qzdy-title", "post-title"]):
-                title_text = article.get_text(strip=True)
-                for fmt in date_formats:
-                    if fmt in title_text and any(keyword in title_text.lower() for keyword in ["免费节点", "free node", "订阅"]):
-                        link = article.find("a") or (article if article.name == "a" else None)
-                        if link and link.get("href"):
-                            full_url = link["href"]
-                            if not full_url.startswith("http"):
-                                full_url = self.base_url.rstrip("/") + "/" + full_url.lstrip("/")
-                            self.logger.log(f"找到匹配文章: {full_url}", "INFO")
-                            return full_url
-            self.logger.log(f"未找到 {target_date.strftime('%Y年%m月%d日')} 的匹配文章", "WARN")
+            cached = self.recall_parsed(kind, self.base_url, resp)
+            if cached is not None:
+                resp.close()
+                self.logger.log("首页未变化，复用上次的索引", "INFO")
+                return dict(cached)
+            index = {}
+
+            def on_heading(title_text, href):
+                day = post_date(title_text) if href else None
+                if day is None:
+                    return False
+                full_url = href
+                if not full_url.startswith("http"):
+                    full_url = self.base_url.rstrip("/") + "/" + full_url.lstrip("/")
+                # 同一天有多篇文章时保留页面中靠前（较新）的那篇
+                index.setdefault(day, full_url)
+                return stop_day is not None and day <= stop_day
+
+            scanner = HomepageScanner(on_heading, heading_classes)
+            if self.scan_response(resp, scanner, stage="homepage_parse", token=token):
+                self.logger.log(f"首页索引完成，共 {len(index)} 篇节点文章", "INFO")
+            else:
+                self.logger.log(f"已找到目标日期的文章，提前结束首页读取（已索引 {len(index)} 篇）", "INFO")
+            self.remember_parsed(kind, self.base_url, resp, dict(index))
+            return index
+        except Cancelled as e:
+            self.logger.log(f"首页读取中止：{e}", "WARN")
             return None
         except Exception as e:
-            self.logger.log(f"查找文章失败: {e}", "ERROR")
+            self.logger.log(f"解析首页失败: {e}", "ERROR")
             return None
 
-    def extract_mihomo_urls(self, post_url):
+    def recall_post(self, target_date):
+        """返回状态库中记录的该日期的文章链接；没有记录时返回 None。"""
+        if self.state_store is None:
+            return None
+        day = target_date.date() if isinstance(target_date, datetime) else target_date
+        return self.state_store.get_post(day)
+
+    def find_post_by_date(self, target_date, index):
+        """在 build_homepage_index() 返回的索引中查找指定日期的文章链接，找到时记录到状态库。"""
+        day = target_date.date() if isinstance(target_date, datetime) else target_date
+        full_url = index.get(day)
+        if full_url:
+            self.logger.log(f"找到匹配文章: {full_url}", "INFO")
+            if self.state_store is not None:
+                self.state_store.put_post(day, full_url)
+            return full_url
+        self.logger.log(f"未找到 {target_date.strftime('%Y年%m月%d日')} 的匹配文章", "WARN")
+        return None
+
+    def extract_mihomo_urls(self, post_url, token=None, trusted_prefix=None):
         """
-        从文章页面提取 Mihomo 订阅链接。
-        使用多个正则表达式和上下文过滤来确保准确性。
+        从文章页面提取 Mihomo 订阅链接，按页面顺序返回。
+        流式扫描正文节点，正文结束即断开连接；根据链接附近的文字区分 mihomo 与 clash.meta。
+        无法区分类型的链接只在以 trusted_prefix（来源站点存放订阅文件的目录）开头时保留。
+        被取消时返回空列表；被取消的结果和空结果都不记录到状态库。
         """
+        if self.state_store is not None:
+            recorded = self.state_store.get_urls(post_url)
+            if recorded is not None:
+                self.logger.log(f"复用已记录的 {len(recorded)} 个订阅链接", "INFO")
+                return recorded
         try:
-            resp = self.make_request(post_url)
+            resp = self.make_request(post_url, stage="post_fetch", token=token)
             if not resp:
                 return []
-            content = resp.text
-            patterns = [
-                r'https://[^\s<>"\' )]*mihomo[^\s<>"\' )]*\.ya?ml',
-                r'(?i)(?:clash\.?mihomo|mihomo).*?订阅.*?(?:地址|链接).*?(https://[^\s<>"\' )]+\.ya?ml)',
-                r'https://www\.85la\.com/wp-content/uploads/[^\s<>"\' )]+\.ya?ml',
-            ]
-            found_urls = set()
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.DOTALL)
-                for match in matches:
-                    url = match[0] if isinstance(match, tuple) else match
-                    found_urls.add(url)
-            
+            cached = self.recall_parsed("post", post_url, resp)
+            if cached is not None:
+                resp.close()
+                return list(cached)
+            scanner = PostScanner(trusted_prefix)
+            # 正常返回时要么读完整页，要么已看到正文结束，结果都是完整的
+            complete = self.scan_response(resp, scanner, stage="extract", token=token) or scanner.done
             filtered_urls = []
-            for url in found_urls:
-                url_index = content.find(url)
-                if url_index != -1:
-                    start = max(0, url_index - 300)
-                    end = min(len(content), url_index + len(url) + 300)
-                    context = content[start:end].lower()
-                    # 确保上下文中包含 'mihomo' 或 'yaml' 且不包含 'clash.meta'
-                    if ('mihomo' in context or 'yaml' in context) and 'clash.meta' not in context:
-                        filtered_urls.append(url)
-                    else:
-                        self.logger.log(f"排除非 Mihomo 链接: {url}", "INFO")
+            for candidate in scanner.results():
+                trusted = bool(trusted_prefix) and candidate.url.startswith(trusted_prefix)
+                if candidate.kind == KIND_MIHOMO or (candidate.kind == KIND_UNKNOWN and trusted):
+                    filtered_urls.append(candidate.url)
+                    self.logger.log(f"候选链接 {candidate.url} (置信度 {candidate.score})", "INFO")
+                else:
+                    self.logger.log(f"排除非 Mihomo 链接: {candidate.url}", "INFO")
+            self.remember_parsed("post", post_url, resp, list(filtered_urls))
+            # 文章可能稍后才补上链接，空结果不记录到状态库
+            if self.state_store is not None and complete and filtered_urls:
+                self.state_store.put_urls(post_url, filtered_urls)
             return filtered_urls
+        except Cancelled as e:
+            self.logger.log(f"文章读取中止：{e}", "WARN")
+            return []
         except Exception as e:
             self.logger.log(f"提取 Mihomo 链接失败: {e}", "ERROR")
             return []
-
-    def validate_yaml_url(self, url):
-        """
-        通过HEAD请求验证URL是否可访问。
-        """
-        try:
-            # 使用 HEAD 请求，更快且不下载整个文件
-            resp = requests.head(url, timeout=10, allow_redirects=True)
-            return resp.status_code == 200
-        except requests.RequestException:
-            return False
\ No newline at end of file
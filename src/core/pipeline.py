@@ -0,0 +1,373 @@
+# refactored_mihomo/src/core/pipeline.py
+import os
+import asyncio
+import functools
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from src.core.cancellation import CancelToken, run_in_thread
+from src.utils.validators import InvalidSubscription, SubscriptionUnchanged
+from src.utils.metrics import MetricsRecorder, recording
+from src.core.subscription import LA85Provider, Found, SourceUnavailable, SubscriptionCoordinator
+from src.utils.constants import VALIDATE_WORKERS, MERGE_MODE, MERGE_DEADLINE, REFRESH_DEADLINE
+
+BACKTRACK_DAYS = 8
+
+STATUS_SUCCESS = "success"
+STATUS_NOT_FOUND = "not_found"
+STATUS_NETWORK_ERROR = "network_error"
+STATUS_SAVE_FAILED = "save_failed"
+STATUS_TIMEOUT = "timeout"
+
+# 查找文章、验证下载两个阶段各自可用的剩余总时间比例；保存阶段可用全部剩余时间
+DISCOVER_SHARE = 0.3
+VALIDATE_SHARE = 0.6
+
+# 状态库中记录当前 85LA.yaml 来源内容哈希的键
+SAVED_HASH_KEY = "saved_hash"
+# _validate() 的返回值：服务器返回 304 且内容与上次保存的相同，没有临时文件
+UNCHANGED = object()
+
+
+class RefreshResult:
+    """一次刷新的结果，status 取值为 STATUS_* 常量之一。"""
+
+    def __init__(self, status, post_url=None, yaml_url=None, valid_urls=None):
+        self.status = status
+        self.post_url = post_url
+        self.yaml_url = yaml_url
+        self.valid_urls = valid_urls or []
+
+    @property
+    def ok(self):
+        return self.status == STATUS_SUCCESS
+
+
+class MihomoPipeline:
+    """
+    基于 asyncio 的订阅刷新流水线：查找文章 -> 提取链接 -> 验证链接 -> 下载保存。
+    阻塞的网络调用在守护线程中执行，各阶段以协程组织并相互重叠。
+    文章查找、链接提取和验证由订阅来源（SubscriptionProvider）完成，多个来源由
+    SubscriptionCoordinator 并发查询，采用最新的有效订阅。
+    每次刷新有 deadline 秒的总期限，按比例分给各阶段；取消 refresh() 所在任务时，
+    进行中的请求和下载经由取消令牌立即中止。
+    """
+
+    def __init__(self, network, file_manager, validator=None, log_func=None, on_result=None,
+                 backtrack_days=BACKTRACK_DAYS, concurrency=VALIDATE_WORKERS, merge=MERGE_MODE,
+                 merge_deadline=MERGE_DEADLINE, state_store=None, deadline=REFRESH_DEADLINE,
+                 providers=None):
+        self.network = network
+        self.file_manager = file_manager
+        self.log = log_func or network.logger.log
+        self.on_result = on_result or (lambda desc, status, url: None)
+        self.backtrack_days = backtrack_days
+        self.concurrency = concurrency
+        self.merge = merge
+        self.merge_deadline = merge_deadline
+        self.deadline = deadline
+        self.state = state_store if state_store is not None else network.state_store
+        # 最近一次刷新的指标，供界面和命令行显示摘要
+        self.metrics = MetricsRecorder()
+        self.health = file_manager.http_client.health
+        # 未指定来源时使用 85LA；validator 是其下载验证所用的 ValidationExecutor
+        self.providers = providers or [LA85Provider(network, file_manager, validator)]
+        self.coordinator = SubscriptionCoordinator(self.providers, self.find, file_manager.discard,
+                                                   log_func=self.log)
+
+    async def refresh(self, start_date=None):
+        """
+        从 start_date 开始向前回溯查找并保存最新的有效订阅，返回 RefreshResult。
+        每次刷新使用新的指标记录器，各阶段的指标在结束时（包括被取消时）导出到保存目录。
+        """
+        metrics = self.metrics = MetricsRecorder()
+        run = CancelToken(self.deadline)
+        status = "cancelled"
+        try:
+            with recording(metrics):
+                result = await self._refresh(start_date, run)
+            status = result.status
+            return result
+        finally:
+            # 中止仍在后台线程中进行的请求（被放弃的下载等）
+            run.cancel()
+            try:
+                metrics.export(self.file_manager.save_dir, status)
+            except OSError as e:
+                self.log(f"写入性能指标失败：{e}", "WARN")
+
+    def _timed_out(self):
+        self.log(f"⏱ 超过总时限 {self.deadline} 秒，停止刷新", "ERROR")
+        return RefreshResult(STATUS_TIMEOUT)
+
+    async def _refresh(self, start_date, run):
+        start_date = start_date or datetime.now()
+        self.log(f"开始查找 {start_date.strftime('%Y年%m月%d日')} 的 Mihomo 订阅...")
+        days = [start_date - timedelta(days=i) for i in range(self.backtrack_days)]
+        for provider in self.providers:
+            provider.begin(days)
+        found, failures = await self.coordinator.find(days, run)
+        if found is None:
+            if run.cancelled or STATUS_TIMEOUT in failures:
+                return self._timed_out()
+            if failures and all(f == STATUS_NETWORK_ERROR for f in failures):
+                return RefreshResult(STATUS_NETWORK_ERROR)
+            self.log("回溯查找失败，没有找到有效的 Mihomo 订阅链接。", "ERROR")
+            return RefreshResult(STATUS_NOT_FOUND)
+        return await self.save(found, run)
+
+    async def find(self, provider, days, run):
+        """
+        在一个来源中从新到旧回溯查找，返回第一个有有效订阅的文章（Found）；
+        找不到时返回 STATUS_NOT_FOUND / STATUS_NETWORK_ERROR / STATUS_TIMEOUT。
+        """
+
+        async def resolve(day):
+            """查找某天的文章及其订阅链接。"""
+            token = run.split(DISCOVER_SHARE)
+            try:
+                post_url = await run_in_thread(provider.discover_post, day, token)
+                if not post_url:
+                    return None, []
+                return post_url, await run_in_thread(provider.extract_links, post_url, token)
+            finally:
+                token.cancel()
+
+        # 只有当天的文章没有有效链接时才回溯解析前一天的文章，成功时不会多请求一篇
+        for day in days:
+            try:
+                post_url, mihomo_urls = await resolve(day)
+            except SourceUnavailable as e:
+                if run.cancelled:
+                    return STATUS_TIMEOUT
+                self.log(str(e), "ERROR")
+                return STATUS_NETWORK_ERROR
+            if run.cancelled:
+                return STATUS_TIMEOUT
+            if not post_url:
+                self.log(f"未找到 {day.strftime('%Y年%m月%d日')} 的文章，继续回溯...", "WARN")
+                continue
+            self.log(f"找到文章: {post_url}")
+            if not mihomo_urls:
+                self.log("未找到 Mihomo 订阅链接，继续回溯...", "WARN")
+                continue
+            download = self.download_all if self.merge else self.download_first
+            downloads = await download(provider, mihomo_urls, run)
+            if downloads:
+                return Found(provider, day.date(), post_url, downloads)
+            if run.cancelled:
+                return STATUS_TIMEOUT
+            self.log("所有找到的链接均无效，继续回溯查找更早的文章...", "WARN")
+        return STATUS_NOT_FOUND
+
+    async def save(self, found, run):
+        """保存采用的订阅：合并模式合并全部下载，否则清理后替换 85LA.yaml。"""
+        urls = [url for url, _ in found.downloads]
+        if self.merge:
+            self.log(f"合并 {len(urls)} 个有效订阅...")
+            saved = await run_in_thread(self.file_manager.save_merged_subscription, found.downloads, run)
+            digest = None  # 合并结果不对应单个来源
+        else:
+            url, tmp_path = found.downloads[0]
+            if tmp_path is None:
+                # 内容与上次保存的相同，无需写入
+                return RefreshResult(STATUS_SUCCESS, found.post_url, url, urls)
+            saved = await run_in_thread(self.file_manager.save_prefetched, tmp_path, run, url)
+            record = self.state.get_validation(url) if self.state is not None else None
+            digest = record[1] if record else None
+        if not saved:
+            if run.cancelled:
+                return self._timed_out()
+            return RefreshResult(STATUS_SAVE_FAILED, found.post_url, urls[0], urls)
+        if self.state is not None:
+            self.state.put_meta(SAVED_HASH_KEY, digest)
+        self.log("Mihomo 订阅更新完成！", "SUCCESS")
+        return RefreshResult(STATUS_SUCCESS, found.post_url, urls[0], urls)
+
+    async def download_first(self, provider, urls, run=None):
+        """
+        对冲下载：按页面顺序先请求第一个镜像；它在对冲延迟（近期首字节耗时的 p95）内没有响应
+        或验证失败时，启用下一个镜像。返回 [(链接, 临时文件路径)]，其余请求随即中止；
+        内容与上次保存的相同时临时文件路径为 None。熔断中的主机直接跳过。全部无效时返回 None。
+        """
+        run = run or CancelToken()
+        saved = self._saved_digest()
+        unchanged = self._recall_unchanged(urls, saved)
+        if unchanged:
+            self.on_result(f"Mihomo {urls.index(unchanged) + 1}", "✅ 有效", unchanged)
+            self.log("订阅内容与上次保存的相同，跳过下载", "INFO")
+            return [(unchanged, None)]
+        delay = self.health.hedge_delay()
+        self.log(f"找到 {len(urls)} 个 Mihomo 链接，按顺序验证（{delay:.1f} 秒无响应即启用备用镜像）...")
+        candidates = self._healthy(urls)
+        if not candidates:
+            return None
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        token = run.split(VALIDATE_SHARE)
+        running = {}
+        launched_at = 0.0
+
+        def launch():
+            nonlocal launched_at
+            idx, url = candidates.pop(0)
+            responded = asyncio.Event()
+            task = asyncio.create_task(self._validate(provider, slots, idx, url, token,
+                                                      lambda: loop.call_soon_threadsafe(responded.set), saved))
+            running[task] = (url, responded)
+            launched_at = loop.time()
+
+        def waiting_for_first_byte():
+            return not any(responded.is_set() for _, responded in running.values())
+
+        winner = None
+        try:
+            launch()
+            while running and winner is None:
+                timeout = None
+                if candidates and waiting_for_first_byte():
+                    timeout = max(0.0, launched_at + delay - loop.time())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.log(f"⏱ 镜像 {delay:.1f} 秒内未响应，启用备用镜像", "INFO")
+                    launch()
+                    continue
+                for task in done:
+                    url, _ = running.pop(task)
+                    tmp_path = self._outcome(task, url)
+                    if tmp_path and winner is None:
+                        winner = (url, None if tmp_path is UNCHANGED else tmp_path)
+                    elif tmp_path:
+                        self._discard(tmp_path)
+                if winner is None and candidates and waiting_for_first_byte():
+                    launch()
+            if winner is None and token.cancelled:
+                self.log("⏱ 验证阶段超时，未完成的链接已放弃", "WARN")
+            return [winner] if winner else None
+        finally:
+            # 其余镜像不再需要，立即中止以免占用带宽
+            token.cancel()
+            for task in running:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    self._discard(task.result())
+                task.cancel()
+
+    def _discard(self, tmp_path):
+        if tmp_path and tmp_path is not UNCHANGED:
+            self.file_manager.discard(tmp_path)
+
+    def _healthy(self, urls):
+        """返回 [(索引, 链接)]，跳过主机处于熔断状态的链接。"""
+        candidates = []
+        for idx, url in enumerate(urls):
+            if self.health.allow(urlsplit(url).hostname or ""):
+                candidates.append((idx, url))
+            else:
+                self.on_result(f"Mihomo {idx+1}", "⛔ 已熔断", url)
+        if not candidates:
+            self.log("所有镜像主机近期均连续失败，已跳过", "WARN")
+        return candidates
+
+    def _saved_digest(self):
+        """返回当前 85LA.yaml 来源内容的哈希；没有状态库、没有记录或文件不存在时返回 None。"""
+        if self.state is None or not os.path.isfile(self.file_manager.get_yaml_file_path()):
+            return None
+        return self.state.get_meta(SAVED_HASH_KEY)
+
+    def _recall_unchanged(self, urls, saved):
+        """
+        按页面顺序查状态库：第一个有效链接的内容哈希等于 saved（上次保存的 85LA.yaml 来源）时返回该链接，
+        此时无需任何请求。遇到没有记录的链接或内容已变化时返回 None。
+        """
+        if saved is None:
+            return None
+        for url in urls:
+            record = self.state.get_validation(url)
+            if record is None:
+                return None
+            ok, digest = record
+            if ok:
+                return url if digest and digest == saved else None
+        return None
+
+    async def download_all(self, provider, urls, run=None):
+        """
+        合并模式：并发验证并下载全部链接，返回 merge_deadline 秒（且不超过本阶段的时间份额）内
+        完成的 [(链接, 临时文件路径)]，较慢的镜像被放弃。全部无效时返回 None。
+        """
+        run = run or CancelToken()
+        self.log(f"找到 {len(urls)} 个 Mihomo 链接，并发验证中...")
+        remaining = run.remaining()
+        budget = self.merge_deadline if remaining is None else min(self.merge_deadline, remaining * VALIDATE_SHARE)
+        candidates = self._healthy(urls)
+        if not candidates:
+            return None
+        token = run.child(budget)
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._validate(provider, slots, idx, url, token)) for idx, url in candidates]
+        pending = tasks
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=budget)
+        finally:
+            token.cancel()
+            for task in pending:
+                task.cancel()
+        downloads = []
+        for (_, url), task in zip(candidates, tasks):
+            if task in pending:
+                self.log(f"⏱ 下载超时，已跳过：{url}", "WARN")
+                continue
+            tmp_path = self._outcome(task, url)
+            if tmp_path:
+                downloads.append((url, tmp_path))
+        return downloads or None
+
+    def _outcome(self, task, url):
+        """返回已完成的验证任务的临时文件路径；任务出错时记为失败的镜像并返回 None。"""
+        try:
+            return task.result()
+        except Exception as e:
+            self.log(f"验证 {url} 出错：{e}", "ERROR")
+            return None
+
+    async def _validate(self, provider, slots, idx, url, token, on_first_byte=None, known_digest=None):
+        """
+        验证并下载一个链接，返回临时文件路径；失败时返回 None。状态库中近期验证为无效的链接不再请求。
+        只有确定不是 Mihomo 配置的响应记为无效；网络错误、超时、熔断和取消都不记录，下次重新验证。
+        收到响应头时在下载线程中调用 on_first_byte()。服务器返回 304 且内容哈希等于 known_digest 时
+        不解码也不解析，返回 UNCHANGED。
+        """
+        record = self.state.get_validation(url) if self.state is not None else None
+        if record is not None and not record[0]:
+            self.on_result(f"Mihomo {idx+1}", "❌ 无效", url)
+            return None
+        async with slots:
+            # 等待方被取消时，后台线程稍后完成的下载由 discard 删除
+            check = functools.partial(provider.validate, on_first_byte=on_first_byte)
+            if known_digest:
+                check = functools.partial(check, known_digest=known_digest)
+            try:
+                tmp_path = await run_in_thread(check, url, token, orphan=self.file_manager.discard)
+            except SubscriptionUnchanged:
+                if self.state is not None:
+                    self.state.put_validation(url, True, known_digest)
+                self.on_result(f"Mihomo {idx+1}", "✅ 有效", url)
+                self.log("订阅未变化（304），跳过解码和解析", "INFO")
+                return UNCHANGED
+            except InvalidSubscription:
+                if self.state is not None:
+                    self.state.put_validation(url, False, None)
+                self.on_result(f"Mihomo {idx+1}", "❌ 无效", url)
+                return None
+        if not tmp_path:
+            self.on_result(f"Mihomo {idx+1}", "⏱ 已中止" if token.cancelled else "⚠️ 请求失败", url)
+            return None
+        if self.state is not None:
+            try:
+                digest = await run_in_thread(self.file_manager.content_hash, tmp_path)
+            except asyncio.CancelledError:
+                self.file_manager.discard(tmp_path)
+                raise
+            self.state.put_validation(url, True, digest)
+        self.on_result(f"Mihomo {idx+1}", "✅ 有效", url)
+        return tmp_path
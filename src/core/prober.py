@@ -0,0 +1,124 @@
+# refactored_mihomo/src/core/prober.py
+import ssl
+import asyncio
+
+from src.core.cancellation import Cancelled
+
+# 基于 UDP 的协议无法用 TCP 连接判断可用性，不探测也不剔除
+UDP_TYPES = {"hysteria", "hysteria2", "tuic", "wireguard"}
+# 这些协议总是在 TLS 之上
+TLS_TYPES = {"trojan"}
+
+PROBE_PRUNE = "prune"
+PROBE_SORT = "sort"
+
+
+class ProbeResult:
+    """单个节点的探测结果；latency 为毫秒，连接失败时为 None，skipped 表示未探测。"""
+
+    def __init__(self, name, latency=None, error=None, skipped=False):
+        self.name = name
+        self.latency = latency
+        self.error = error
+        self.skipped = skipped
+
+    @property
+    def alive(self):
+        return self.skipped or self.latency is not None
+
+
+class NodeProber:
+    """
+    并发探测节点的 TCP 连通性（可选完成 TLS 握手）并记录延迟。
+    concurrency 限制同时进行的连接数，timeout 是每次探测的截止时间（秒）。
+    """
+
+    def __init__(self, concurrency, timeout, tls=True):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.tls = tls
+        self._ssl_context = None
+
+    def ssl_context(self):
+        # 只判断握手能否完成，免费节点大多是自签证书，不校验证书
+        if self._ssl_context is None:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            self._ssl_context = context
+        return self._ssl_context
+
+    def wants_tls(self, proxy):
+        return self.tls and (proxy.get("tls") is True or str(proxy.get("type", "")).lower() in TLS_TYPES)
+
+    async def probe(self, server, port, tls=False, sni=None):
+        """连接 server:port（tls 为 True 时完成握手），返回耗时毫秒数；失败时抛出异常。"""
+        options = {"ssl": self.ssl_context(), "server_hostname": sni or server} if tls else {}
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        _, writer = await asyncio.wait_for(asyncio.open_connection(server, port, **options), self.timeout)
+        latency = (loop.time() - started) * 1000
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), self.timeout)
+        except (OSError, asyncio.TimeoutError, ssl.SSLError):
+            pass
+        return latency
+
+    async def probe_all(self, proxies, token=None):
+        """
+        探测全部节点，返回与 proxies 顺序对应的 ProbeResult 列表。
+        token 被取消或到期时放弃整轮探测并抛出 Cancelled，不返回不完整的结果。
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+        if self.tls:
+            self.ssl_context()  # 加载证书较慢，提前创建以免阻塞事件循环、计入其他节点的延迟
+
+        async def run(proxy):
+            if not isinstance(proxy, dict):
+                return ProbeResult(None, skipped=True)
+            name = proxy.get("name")
+            server, port = proxy.get("server"), proxy.get("port")
+            if str(proxy.get("type", "")).lower() in UDP_TYPES or not server or not port:
+                return ProbeResult(name, skipped=True)
+            async with slots:
+                try:
+                    latency = await self.probe(str(server), int(port), self.wants_tls(proxy),
+                                               proxy.get("sni") or proxy.get("servername"))
+                except (OSError, ValueError, asyncio.TimeoutError, ssl.SSLError) as e:
+                    return ProbeResult(name, error=e)
+            return ProbeResult(name, latency)
+
+        probes = asyncio.gather(*(run(proxy) for proxy in proxies))
+        if token is None:
+            return await probes
+        loop = asyncio.get_running_loop()
+        with token.on_cancel(lambda: loop.call_soon_threadsafe(probes.cancel)):
+            try:
+                return await probes
+            except asyncio.CancelledError:
+                if token.cancelled:
+                    raise Cancelled("连通性探测已中止") from None
+                raise
+
+    def run(self, proxies, token=None):
+        """在独立的事件循环中探测（供工作线程调用）。"""
+        return asyncio.run(self.probe_all(proxies, token))
+
+
+def apply_probe_results(proxies, results, action):
+    """
+    按探测结果处理节点列表：PROBE_PRUNE 去掉不可用的节点，PROBE_SORT 按延迟从低到高排序
+    （未探测的节点排在可用节点之后，不可用的排在最后）。返回新的节点列表。
+    """
+    pairs = list(zip(proxies, results))
+    if action == PROBE_PRUNE:
+        return [proxy for proxy, result in pairs if result.alive]
+    if action == PROBE_SORT:
+        def rank(pair):
+            result = pair[1]
+            if result.latency is not None:
+                return (0, result.latency)
+            return (1, 0) if result.skipped else (2, 0)
+        return [proxy for proxy, _ in sorted(pairs, key=rank)]
+    return list(proxies)
@@ -0,0 +1,189 @@
+# refactored_mihomo/src/core/proxy_processor.py
+import os
+import re
+
+import yaml
+
+class Loader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """按 YAML 1.2 核心模式识别标量，见 CORE_RESOLVERS。"""
+
+
+class Dumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    """每个节点写成一行的流式映射，其余部分保持块格式。"""
+
+
+# PyYAML 默认按 YAML 1.1 解析，会把 012345 读成八进制、把 1:30 读成六十进制、把 yes/on 读成布尔值，
+# 写回时改变原值。这里只把 YAML 1.2 核心模式中写回后原样不变的写法识别为布尔、空值和整数，
+# 其余标量（包括浮点数和日期）都保留为字符串；Dumper 使用同一组规则，这些字符串写回时不加引号。
+CORE_RESOLVERS = (
+    ("tag:yaml.org,2002:bool", r"^(?:true|True|TRUE|false|False|FALSE)$", "tTfF"),
+    ("tag:yaml.org,2002:null", r"^(?:~|null|Null|NULL|)$", ["~", "n", "N", ""]),
+    ("tag:yaml.org,2002:int", r"^[-+]?(?:0|[1-9][0-9]*)$", "-+0123456789"),
+    ("tag:yaml.org,2002:merge", r"^(?:<<)$", "<"),
+)
+for cls in (Loader, Dumper):
+    cls.yaml_implicit_resolvers = {}
+    for tag, pattern, first in CORE_RESOLVERS:
+        cls.add_implicit_resolver(tag, re.compile(pattern), list(first))
+
+
+class FlowMap(dict):
+    pass
+
+
+Dumper.add_representer(FlowMap, lambda dumper, data: dumper.represent_mapping(
+    "tag:yaml.org,2002:map", data, flow_style=True))
+
+# emoji、国旗（区域指示符）、变体选择符和零宽字符
+EMOJI_PATTERN = re.compile(
+    "[\U0001F000-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF\U0000FE00-\U0000FE0F\u200b-\u200f\u2060]+")
+URL_PATTERN = re.compile(r"(?:https?://|t\.me/)\S+", re.IGNORECASE)
+SPACES_PATTERN = re.compile(r"\s+")
+# 同类型、同地址端口、同凭据的节点视为重复
+CREDENTIAL_FIELDS = ("uuid", "password", "username", "auth-str", "auth", "psk", "private-key", "cipher", "obfs")
+
+
+def normalize_name(name):
+    """去掉名称中的 emoji、链接和多余空白。"""
+    name = EMOJI_PATTERN.sub(" ", str(name))
+    name = URL_PATTERN.sub(" ", name)
+    return SPACES_PATTERN.sub(" ", name).strip(" -_|")
+
+
+def proxy_key(proxy):
+    """用于去重的哈希键：(类型, 服务器, 端口, 凭据)。"""
+    return (str(proxy.get("type", "")).lower(), str(proxy.get("server", "")).lower(),
+            str(proxy.get("port", ""))) + tuple(str(proxy.get(field, "")) for field in CREDENTIAL_FIELDS)
+
+
+def _rename_rule(rule, renames):
+    """规则的最后一个策略字段（忽略 no-resolve）如果指向被改名的节点则同步更新。"""
+    parts = str(rule).split(",")
+    target = len(parts) - 1
+    if target > 0 and parts[target].strip() == "no-resolve":
+        target -= 1
+    if target > 0 and parts[target].strip() in renames:
+        parts[target] = renames[parts[target].strip()]
+    return ",".join(parts)
+
+
+def dedup_proxies(proxies):
+    """
+    单遍处理节点列表：规范化名称，按哈希键去掉重复节点。
+    返回 (保留的节点, 原名称 -> 新名称的映射)。
+    """
+    seen = {}
+    renames = {}
+    used_names = set()
+    kept = []
+    for proxy in proxies:
+        if not isinstance(proxy, dict) or "name" not in proxy:
+            kept.append(proxy)
+            continue
+        old_name = str(proxy["name"])
+        key = proxy_key(proxy)
+        if key in seen:
+            renames.setdefault(old_name, seen[key])
+            continue
+        base = normalize_name(old_name) or f"{proxy.get('type', 'proxy')}-{proxy.get('server', '')}"
+        name, suffix = base, 2
+        while name in used_names:
+            name, suffix = f"{base} {suffix}", suffix + 1
+        used_names.add(name)
+        proxy["name"] = name
+        seen[key] = name
+        renames.setdefault(old_name, name)
+        kept.append(FlowMap(proxy))
+    return kept, renames
+
+
+def rewrite_references(config, renames):
+    """按改名映射同步更新 proxy-groups 和 rules 中的节点引用，并去掉组内重复的成员。"""
+    for group in config.get("proxy-groups") or []:
+        if not isinstance(group, dict) or not isinstance(group.get("proxies"), list):
+            continue
+        members, seen = [], set()
+        for member in group["proxies"]:
+            member = renames.get(str(member), member)
+            if str(member) not in seen:
+                seen.add(str(member))
+                members.append(member)
+        group["proxies"] = members
+    if isinstance(config.get("rules"), list):
+        config["rules"] = [_rename_rule(rule, renames) for rule in config["rules"]]
+
+
+def drop_references(config, names):
+    """从 proxy-groups 和 rules 中去掉已删除节点的引用；分组因此变空时改为 DIRECT。"""
+    names = set(names)
+    if not names:
+        return
+    for group in config.get("proxy-groups") or []:
+        if not isinstance(group, dict) or not isinstance(group.get("proxies"), list):
+            continue
+        group["proxies"] = [m for m in group["proxies"] if m not in names]
+        if not group["proxies"] and not group.get("use"):
+            group["proxies"] = ["DIRECT"]
+    if isinstance(config.get("rules"), list):
+        config["rules"] = [_rename_rule(rule, dict.fromkeys(names, "DIRECT")) for rule in config["rules"]]
+
+
+def process_config(config):
+    """
+    规范化并去重 proxies，同步更新 proxy-groups 和 rules 中的引用。
+    返回 (原节点数, 保留节点数)。
+    """
+    proxies = config.get("proxies") or []
+    config["proxies"], renames = dedup_proxies(proxies)
+    rewrite_references(config, renames)
+    return len(proxies), len(config["proxies"])
+
+
+def merge_configs(configs):
+    """
+    合并多份订阅：以第一份为基础，合并全部节点并去重，再重新生成 proxy-groups。
+    包含基础配置全部节点的分组会追加其他订阅的节点；只含部分节点的分组（如按地区划分）保持不变；
+    基础配置没有分组时生成默认的选择组和自动测速组。返回 (原节点数, 保留节点数)。
+    """
+    base = configs[0]
+    base_names = [str(p["name"]) for p in base.get("proxies") or [] if isinstance(p, dict) and "name" in p]
+    proxies = [proxy for config in configs for proxy in config.get("proxies") or []]
+    base["proxies"], renames = dedup_proxies(proxies)
+    rewrite_references(base, renames)
+
+    names = [p["name"] for p in base["proxies"] if isinstance(p, dict) and "name" in p]
+    base_kept = {renames[name] for name in base_names}
+    groups = [g for g in base.get("proxy-groups") or [] if isinstance(g, dict)]
+    for group in groups:
+        members = group.get("proxies")
+        if not isinstance(members, list) or not base_kept:
+            continue
+        present = set(members)
+        if base_kept <= present:
+            members.extend(name for name in names if name not in present)
+    if not groups:
+        base["proxy-groups"] = [
+            {"name": "节点选择", "type": "select", "proxies": ["自动选择", "DIRECT"] + names},
+            {"name": "自动选择", "type": "url-test", "url": "http://www.gstatic.com/generate_204",
+             "interval": 300, "proxies": names},
+        ]
+        base.setdefault("rules", ["MATCH,节点选择"])
+    return len(proxies), len(base["proxies"])
+
+
+def load_config(path):
+    """读取整个 YAML 配置到内存；不是包含 proxies 列表的映射时返回 None。"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.load(f, Loader=Loader)
+    if not isinstance(config, dict) or not isinstance(config.get("proxies"), list):
+        return None
+    return config
+
+
+def dump_config(config, path):
+    """写出配置并 fsync，节点每个一行。"""
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(config, f, Dumper=Dumper, allow_unicode=True, sort_keys=False,
+                  default_flow_style=False, width=4096)
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,114 @@
+# refactored_mihomo/src/core/snapshots.py
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+from src.utils.constants import SNAPSHOT_KEEP, SNAPSHOT_MAX_AGE
+
+# 保存目录下存放历史快照的子目录
+SNAPSHOT_DIR = "history"
+
+
+class SnapshotStore:
+    """
+    按内容哈希保存 85LA.yaml 的历史版本：每个版本以 gzip 压缩为 <sha256>.yaml.gz，
+    index.json 按从新到旧记录日期、来源链接、节点数和大小，列出历史时无需打开快照。
+    相同内容只保存一份；超过 keep 个或早于 max_age 秒的版本被删除，最新版本始终保留。
+    """
+
+    def __init__(self, directory, keep=SNAPSHOT_KEEP, max_age=SNAPSHOT_MAX_AGE):
+        self.directory = directory
+        self.keep = keep
+        self.max_age = max_age
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        self.index = []
+        self.index_mtime = None
+
+    def _reload(self):
+        """索引文件被其他进程更新时重新读取（调用方持有锁）。"""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.index_mtime:
+            return
+        self.index_mtime = mtime
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = []
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self.index_mtime = os.stat(self.index_path).st_mtime_ns
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest + ".yaml.gz")
+
+    def entries(self):
+        """历史版本列表（从新到旧），每项含 hash / date / url / nodes / size / compressed。"""
+        with self.lock:
+            self._reload()
+            return [dict(entry) for entry in self.index]
+
+    def add(self, path, digest, source_url=None, nodes=None):
+        """
+        把 path 记为最新版本。与最新版本内容相同时什么也不写；与更早的版本相同时只更新索引。
+        返回 True 表示新增或更新了记录。
+        """
+        with self.lock:
+            self._reload()
+            if self.index and self.index[0]["hash"] == digest:
+                return False
+            entry = next((e for e in self.index if e["hash"] == digest), None)
+            if entry is None or not os.path.isfile(self.path(digest)):
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = self.path(digest) + ".tmp"
+                try:
+                    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.replace(tmp_path, self.path(digest))
+                except BaseException:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+            if entry is not None:
+                self.index.remove(entry)
+            self.index.insert(0, {"hash": digest, "date": time.time(), "url": source_url, "nodes": nodes,
+                                  "size": os.path.getsize(path),
+                                  "compressed": os.path.getsize(self.path(digest))})
+            self._prune()
+            self._save_index()
+            return True
+
+    def _prune(self):
+        """按保留策略删除旧版本（调用方持有锁）。"""
+        cutoff = time.time() - self.max_age if self.max_age else None
+        kept = self.index[:1]
+        for entry in self.index[1:]:
+            if len(kept) < self.keep and (cutoff is None or entry["date"] >= cutoff):
+                kept.append(entry)
+            else:
+                try:
+                    os.remove(self.path(entry["hash"]))
+                except OSError:
+                    pass
+        self.index = kept
+
+    def extract(self, digest, dest_path):
+        """把快照解压到 dest_path（原子替换），返回 dest_path。"""
+        tmp_path = dest_path + ".tmp"
+        with gzip.open(self.path(digest), "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, dest_path)
+        return dest_path
@@ -0,0 +1,94 @@
+# refactored_mihomo/src/core/state_store.py
+import json
+import sqlite3
+import threading
+import time
+
+from src.utils.constants import STATE_POST_TTL, STATE_URLS_TTL, STATE_VALIDATION_TTL, STATE_HOST_TTL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (day TEXT PRIMARY KEY, post_url TEXT NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS post_urls (post_url TEXT PRIMARY KEY, urls TEXT NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS validations (url TEXT PRIMARY KEY, ok INTEGER NOT NULL, content_hash TEXT,
+                                        updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, failures INTEGER NOT NULL, open_until REAL NOT NULL,
+                                  updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT, updated REAL NOT NULL);
+"""
+
+
+class StateStore:
+    """
+    基于 SQLite 的运行状态库：记录 日期 -> 文章链接、文章 -> 订阅链接、订阅链接 -> 验证结果和内容哈希，
+    各自带有效期。同一天重复刷新时可以跳过首页、文章和订阅请求。
+    另外记录各主机的连续失败次数和熔断截止时间，供 HostHealth 跨运行使用。
+    """
+
+    def __init__(self, db_path, post_ttl=STATE_POST_TTL, urls_ttl=STATE_URLS_TTL,
+                 validation_ttl=STATE_VALIDATION_TTL, host_ttl=STATE_HOST_TTL):
+        self.db_path = db_path
+        self.ttls = {"posts": post_ttl, "post_urls": urls_ttl, "validations": validation_ttl,
+                     "hosts": host_ttl}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            now = time.time()
+            for table, ttl in self.ttls.items():
+                self.conn.execute(f"DELETE FROM {table} WHERE updated < ?", (now - ttl,))
+
+    def _get(self, table, columns, key_column, key):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {columns} FROM {table} WHERE {key_column} = ? AND updated >= ?",
+                (key, time.time() - self.ttls[table])).fetchone()
+        return row
+
+    def _put(self, table, values):
+        placeholders = ", ".join("?" * (len(values) + 1))
+        with self.lock:
+            self.conn.execute(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", (*values, time.time()))
+
+    def get_post(self, day):
+        row = self._get("posts", "post_url", "day", day.isoformat())
+        return row[0] if row else None
+
+    def put_post(self, day, post_url):
+        self._put("posts", (day.isoformat(), post_url))
+
+    def get_urls(self, post_url):
+        """返回记录的订阅链接列表；没有记录或已过期时返回 None。"""
+        row = self._get("post_urls", "urls", "post_url", post_url)
+        return json.loads(row[0]) if row else None
+
+    def put_urls(self, post_url, urls):
+        self._put("post_urls", (post_url, json.dumps(list(urls))))
+
+    def get_validation(self, url):
+        """返回 (是否有效, 内容哈希)；没有记录或已过期时返回 None。"""
+        row = self._get("validations", "ok, content_hash", "url", url)
+        return (bool(row[0]), row[1]) if row else None
+
+    def put_validation(self, url, ok, content_hash=None):
+        self._put("validations", (url, int(bool(ok)), content_hash))
+
+    def get_host(self, host):
+        """返回 (连续失败次数, 熔断截止时间)；没有记录或已过期时返回 None。"""
+        row = self._get("hosts", "failures, open_until", "host", host)
+        return (row[0], row[1]) if row else None
+
+    def put_host(self, host, failures, open_until):
+        self._put("hosts", (host, failures, open_until))
+
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_meta(self, key, value):
+        self._put("meta", (key, value))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,9 +1,192 @@
 # refactored_mihomo/src/core/subscription.py
-from src.utils.validators import validate_yaml_url
+import abc
+import asyncio
+import re
+import threading
+from datetime import date
+from urllib.parse import urljoin
 
+from src.core.validation import ValidationExecutor
+from src.utils.constants import SOURCE_DEADLINE
 
-# This module can handle subscription-specific logic if expanded.
-# For now, it's minimal as the original code integrates it into network and file_manager.
-def get_valid_subscription_urls(network, post_url):
-    urls = network.extract_mihomo_urls(post_url)
-    return [url for url in urls if validate_yaml_url(url)]
\ No newline at end of file
+
+class SourceUnavailable(Exception):
+    """来源站点无法访问（例如首页抓取失败），继续回溯更早的日期也没有意义。"""
+
+
+class SubscriptionProvider(abc.ABC):
+    """
+    订阅来源接口。除 begin() 外都是阻塞调用，由流水线在后台线程中执行，token 为取消令牌：
+    discover_post(day, token) 返回某天的文章链接，没有时返回 None，站点不可用时抛出 SourceUnavailable；
+    extract_links(post_url, token) 按优先顺序返回文章中的订阅链接；
+    validate(url, token, on_first_byte, known_digest) 下载并验证订阅，返回临时文件路径；确定不是订阅时抛出
+    InvalidSubscription，内容哈希等于 known_digest 且未变化时可抛出 SubscriptionUnchanged，网络错误等暂时性失败返回 None。
+    """
+    name = "source"
+
+    def begin(self, days):
+        """每次刷新开始时调用，days 为本次回溯的日期（从新到旧）。"""
+
+    @abc.abstractmethod
+    def discover_post(self, day, token=None):
+        """返回 day 当天的文章链接。"""
+
+    @abc.abstractmethod
+    def extract_links(self, post_url, token=None):
+        """返回文章中的订阅链接列表。"""
+
+    @abc.abstractmethod
+    def validate(self, url, token=None, on_first_byte=None, known_digest=None):
+        """下载并验证订阅，返回临时文件路径。"""
+
+
+class LA85Provider(SubscriptionProvider):
+    """
+    85la.com：首页按标题中的日期索引节点文章，文章正文中的 mihomo 链接即订阅镜像。
+    抓取和解析由 MihomoNetwork 完成，下载验证由 MihomoFileManager 完成；下面的站点规则作为参数传给它们。
+    """
+    name = "85LA"
+    # 首页文章标题元素的 class
+    heading_classes = ("qzdy-title", "post-title")
+    # 节点文章标题中的关键词
+    post_keywords = ("免费节点", "free node", "订阅")
+    # 匹配标题中的发布日期，覆盖 2024年1月2日 / 2024/1/2 / 2024-01-02 / 2024.01.02 等写法
+    date_pattern = re.compile(r'(\d{4})\s*[年/.\-]\s*(\d{1,2})\s*[月/.\-]\s*(\d{1,2})')
+    # 站内存放订阅文件的目录（相对首页），其中无法区分类型的 yaml 链接也视为 mihomo 订阅
+    uploads_path = "wp-content/uploads/"
+
+    def __init__(self, network, file_manager, validator=None):
+        self.network = network
+        self.file_manager = file_manager
+        self.uploads_prefix = urljoin(network.base_url, self.uploads_path)
+        self.validator = validator or ValidationExecutor(file_manager.fetch_subscription,
+                                                         is_running_func=network.is_running)
+        self.lock = threading.Lock()
+        self.oldest = None
+        self.index = None
+        self.index_failed = False
+
+    def begin(self, days):
+        with self.lock:
+            self.oldest = days[-1] if days else None
+            self.index = None
+            self.index_failed = False
+
+    def discover_post(self, day, token=None):
+        """
+        优先查状态库；没有记录时才抓取首页。每次刷新最多抓取一次首页，
+        读到回溯范围内最早的一天即停止。
+        """
+        post_url = self.network.recall_post(day)
+        if post_url:
+            return post_url
+        with self.lock:
+            if self.index is None and not self.index_failed:
+                self.index = self.network.build_homepage_index(self.oldest, self.heading_classes, self.post_date,
+                                                               token)
+                self.index_failed = self.index is None
+            index = self.index
+        if index is None:
+            raise SourceUnavailable("无法建立首页索引，请检查网络后重试。")
+        return self.network.find_post_by_date(day, index)
+
+    def post_date(self, title):
+        """标题属于节点文章时返回其中的发布日期，否则返回 None。"""
+        if not any(keyword in title.lower() for keyword in self.post_keywords):
+            return None
+        match = self.date_pattern.search(title)
+        if not match:
+            return None
+        try:
+            return date(*(int(part) for part in match.groups()))
+        except ValueError:
+            return None
+
+    def extract_links(self, post_url, token=None):
+        return self.network.extract_mihomo_urls(post_url, token, self.uploads_prefix)
+
+    def validate(self, url, token=None, on_first_byte=None, known_digest=None):
+        return self.validator.check(url, token, on_first_byte=on_first_byte, known_digest=known_digest)
+
+
+class Found:
+    """
+    某个来源找到的订阅：day 为文章日期，downloads 为 [(链接, 临时文件路径)]。
+    内容与上次保存的相同时临时文件路径为 None。
+    """
+
+    def __init__(self, provider, day, post_url, downloads):
+        self.provider = provider
+        self.day = day
+        self.post_url = post_url
+        self.downloads = downloads
+
+    def discard(self, discard_func):
+        for _, tmp_path in self.downloads:
+            if tmp_path:
+                discard_func(tmp_path)
+
+
+class SubscriptionCoordinator:
+    """
+    并发查询多个来源，返回最新的有效订阅。search(provider, days, token) 是单个来源的查找协程，
+    返回 Found 或失败原因。某个来源找到最新一天的订阅时立即采用；否则等待全部来源结束，
+    或在 deadline 秒后采用已找到的最新结果。未被采用的下载由 discard 删除。
+    """
+
+    def __init__(self, providers, search, discard, deadline=SOURCE_DEADLINE, log_func=None):
+        self.providers = providers
+        self.search = search
+        self.discard = discard
+        self.deadline = deadline
+        self.log = log_func or (lambda message, level="INFO": None)
+
+    async def find(self, days, run):
+        """返回 (Found 或 None, 各来源的失败原因列表)。"""
+        if len(self.providers) == 1:
+            result = await self.search(self.providers[0], days, run)
+            return (result, []) if isinstance(result, Found) else (None, [result])
+
+        loop = asyncio.get_running_loop()
+        ends = loop.time() + self.deadline if self.deadline else None
+        newest = days[0].date()
+        tokens = [run.child() for _ in self.providers]
+        pending = {asyncio.create_task(self.search(provider, days, token))
+                   for provider, token in zip(self.providers, tokens)}
+        found, failures = [], []
+        try:
+            while pending:
+                timeout = max(0.0, ends - loop.time()) if found and ends is not None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self.log(f"来源查询出错：{e}", "ERROR")
+                        continue
+                    if isinstance(result, Found):
+                        found.append(result)
+                    else:
+                        failures.append(result)
+                if any(f.day == newest for f in found):
+                    break
+                if found and ends is not None and loop.time() >= ends:
+                    self.log(f"⏱ 已到来源查询时限 {self.deadline} 秒，采用目前最新的结果", "INFO")
+                    break
+        finally:
+            for token in tokens:
+                token.cancel()
+            for task in pending:
+                if task.done() and not task.cancelled() and task.exception() is None \
+                        and isinstance(task.result(), Found):
+                    task.result().discard(self.discard)
+                task.cancel()
+        if not found:
+            return None, failures
+        # 日期相同时按来源的配置顺序优先
+        best = max(found, key=lambda f: (f.day, -self.providers.index(f.provider)))
+        for other in found:
+            if other is not best:
+                other.discard(self.discard)
+        self.log(f"采用来源 {best.provider.name} 的 {best.day.strftime('%Y年%m月%d日')} 订阅", "INFO")
+        return best, failures
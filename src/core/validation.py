@@ -0,0 +1,67 @@
+# refactored_mihomo/src/core/validation.py
+import threading
+import time
+from urllib.parse import urlsplit
+
+from src.utils.constants import VALIDATE_PER_HOST, VALIDATE_RATE
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器，rate 为每秒补充的令牌数，capacity 为允许的突发量。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, is_running=lambda: True):
+        """阻塞直到取得一个令牌；任务被停止时返回 False。"""
+        while is_running():
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(min(wait, 0.2))
+        return False
+
+
+class ValidationExecutor:
+    """
+    订阅链接验证器：每主机并发上限 + 共享令牌桶限速。全局并发数由调用方（流水线）限制。
+    """
+
+    def __init__(self, validate_func, per_host=VALIDATE_PER_HOST, rate=VALIDATE_RATE, is_running_func=lambda: True):
+        self.validate_func = validate_func
+        self.per_host = per_host
+        self.bucket = TokenBucket(rate)
+        self.is_running = is_running_func
+        self.host_slots = {}
+        self.host_lock = threading.Lock()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).hostname or ''
+        with self.host_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_slots[host]
+
+    def check(self, url, token=None, **kwargs):
+        """
+        在主机并发上限和全局限速下验证单个链接（阻塞调用），返回 validate_func 的结果，被中止时返回 False。
+        传入 token 时一并交给 validate_func(url, token, **kwargs)，取消后不再等待令牌。
+        """
+        slot = self._host_slot(url)
+        with slot:
+            if token is None:
+                return self.validate_func(url, **kwargs) if self.bucket.acquire(self.is_running) else False
+            if not self.bucket.acquire(lambda: self.is_running() and not token.cancelled):
+                return False
+            return self.validate_func(url, token, **kwargs)
@@ -1,17 +1,25 @@
 # refactored_mihomo/src/gui/main_window.py
 import os
+import importlib
 import threading
-import webbrowser
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 
-from src.core.network import MihomoNetwork
-from src.core.file_manager import MihomoFileManager
 from src.utils.logger import MihomoLogger
-from src.utils.constants import SAVE_DIR, BASE_URL, TIMEOUT, RETRY
+from src.utils.constants import (SAVE_DIR, BASE_URL, TIMEOUT, RETRY, CONNECT_TIMEOUT, POOL_MAXSIZE,
+                                 LOG_VIEW_MAX_LINES)
+from src.gui.ui_queue import UiUpdateQueue
 from src.gui.tabs import create_main_tab, create_files_tab, create_about_tab
-from src.gui.ui_utils import copy_to_clipboard, on_title_click, shake_window, rainbow_title_effect
+from src.gui.ui_utils import copy_to_clipboard, on_title_click, shake_window, rainbow_title_effect, open_url
+
+# 网络栈（requests/asyncio 等）较重，窗口显示后才在后台预热导入
+HEAVY_MODULES = ("asyncio", "src.core.pipeline", "src.core.network", "src.core.file_manager", "src.core.http_cache",
+                 "src.core.state_store")
+WARMUP_DELAY_MS = 300
+# 关闭窗口时等待搜索线程结束的最长时间（秒）；进行中的请求会被立即中止，通常远小于此值
+SHUTDOWN_JOIN_TIMEOUT = 0.5
 
 
 class MihomoSubscriptionGUI:
@@ -46,14 +54,24 @@ class MihomoSubscriptionGUI:
         self.DEFAULT_SAVE_DIR = SAVE_DIR
         os.makedirs(self.DEFAULT_SAVE_DIR, exist_ok=True)
         self.logger = MihomoLogger(self.DEFAULT_SAVE_DIR)
-        self.network = MihomoNetwork(
-            BASE_URL, TIMEOUT, RETRY,
-            self.logger, lambda: self.is_running
-        )
-        self.file_manager = MihomoFileManager(self.DEFAULT_SAVE_DIR, self.logger)
+        # 网络、文件管理和流水线对象在首次使用时由 init_services() 创建
+        self.http_client = None
+        self.network = None
+        self.file_manager = None
+        self.validator = None
+        self.pipeline = None
+        self.snapshots = None
         self.create_widgets()
+        # 工作线程的日志和结果统一经由队列，由主循环按节拍批量刷新到界面
+        self.ui_queue = UiUpdateQueue(self.root)
+        self.ui_queue.register('log', self.update_log_display)
+        self.ui_queue.register('result', self.add_result_items)
+        self.ui_queue.start()
+        self.root.after(WARMUP_DELAY_MS, self.warm_up)
         self.is_running = False
         self.search_thread = None
+        self.pipeline_loop = None
+        self.pipeline_task = None
 
         # 绑定窗口拖动事件
         self.title_frame.bind("<ButtonPress-1>", self.start_move)
@@ -86,6 +104,49 @@ class MihomoSubscriptionGUI:
         y = self.root.winfo_y() + deltay
         self.root.geometry(f"+{x}+{y}")
 
+    def warm_up(self):
+        """首帧显示后在后台线程预先导入网络栈，使第一次查找无需等待导入。"""
+        def import_heavy_modules():
+            for name in HEAVY_MODULES:
+                importlib.import_module(name)
+        threading.Thread(target=import_heavy_modules, daemon=True).start()
+
+    def init_services(self):
+        """首次使用时创建网络、文件管理和流水线对象（在主线程调用）。"""
+        if self.pipeline is not None:
+            return
+        from src.core.http_client import MihomoHttpClient
+        from src.core.http_cache import HttpCache
+        from src.core.host_health import HostHealth
+        from src.core.network import MihomoNetwork
+        from src.core.state_store import StateStore
+        from src.core.file_manager import MihomoFileManager
+        from src.core.validation import ValidationExecutor
+        from src.core.pipeline import MihomoPipeline
+
+        # 同一天内已解析过的文章、链接和验证结果直接从状态库读取；主机熔断状态也保存在其中
+        state_store = StateStore(os.path.join(self.DEFAULT_SAVE_DIR, "state.db"))
+        # 所有请求共用一个连接池，避免对同一主机重复握手
+        self.http_client = MihomoHttpClient(TIMEOUT, CONNECT_TIMEOUT, POOL_MAXSIZE,
+                                            cache=HttpCache(os.path.join(self.DEFAULT_SAVE_DIR, ".http_cache")),
+                                            health=HostHealth(state_store))
+        self.network = MihomoNetwork(
+            BASE_URL, TIMEOUT, RETRY,
+            self.logger, lambda: self.is_running,
+            http_client=self.http_client,
+            state_store=state_store
+        )
+        self.file_manager = MihomoFileManager(self.DEFAULT_SAVE_DIR, self.logger, http_client=self.http_client,
+                                              snapshots=self.snapshot_store(self.DEFAULT_SAVE_DIR))
+        # 验证与下载合并为一次流式 GET
+        self.validator = ValidationExecutor(self.file_manager.fetch_subscription,
+                                            is_running_func=lambda: self.is_running)
+        self.pipeline = MihomoPipeline(
+            self.network, self.file_manager, self.validator,
+            log_func=self.log_message,
+            on_result=lambda desc, status, url: self.ui_queue.post('result', (desc, status, url))
+        )
+
     # ========== UI 创建（统一缩小字体/间距） ==========
     def create_widgets(self):
         """创建并布局所有GUI组件。"""
@@ -98,7 +159,7 @@ class MihomoSubscriptionGUI:
                  bg='#2c3e50', fg='white').pack(side='left', padx=10, expand=True, anchor='w')
 
         # 添加关闭按钮
-        tk.Button(self.title_frame, text="✖", command=self.root.destroy,
+        tk.Button(self.title_frame, text="✖", command=self.on_closing,
                   font=('微软雅黑', 10, 'bold'),
                   bg='#2c3e50', fg='white',
                   bd=0, relief='flat', activebackground='#e74c3c').pack(side='right')
@@ -116,9 +177,26 @@ class MihomoSubscriptionGUI:
         self.about_tab = tk.Frame(self.notebook, bg='#f0f0f0')
         self.notebook.add(self.about_tab, text="关于")
 
+        # 只立即创建首个标签页，其余标签页在第一次被选中时才创建
         create_main_tab(self)
+        self.tab_builders = {
+            str(self.files_tab): self.build_files_tab,
+            str(self.about_tab): lambda: create_about_tab(self),
+        }
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.ensure_tab(self.notebook.select()))
+
+    def ensure_tab(self, tab):
+        """确保指定标签页的组件已经创建。"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if builder:
+            builder()
+
+    def tab_built(self, tab):
+        return str(tab) not in self.tab_builders
+
+    def build_files_tab(self):
         create_files_tab(self)
-        create_about_tab(self)
+        self.refresh_files()
 
     def populate_date_options(self):
         """填充日期选择下拉列表，显示最近8天的日期。"""
@@ -137,7 +215,8 @@ class MihomoSubscriptionGUI:
                                          title="选择保存文件夹")
         if folder:
             self.save_path_var.set(folder)
-            self.files_path_label.config(text=folder)
+            if self.tab_built(self.files_tab):
+                self.files_path_label.config(text=folder)
 
     def get_target_date(self):
         """根据用户选择的下拉列表项，返回对应的日期对象。"""
@@ -148,12 +227,15 @@ class MihomoSubscriptionGUI:
         """在GUI日志框中显示带时间戳和级别的日志消息。"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         formatted_msg = f"[{timestamp}] {level}: {message}\n"
-        self.root.after(0, lambda: self.update_log_display(formatted_msg))
+        self.ui_queue.post('log', formatted_msg)
         self.logger.log(message, level)
 
-    def update_log_display(self, msg):
-        """将日志消息添加到日志文本框并滚动到底部。"""
-        self.log_text.insert(tk.END, msg)
+    def update_log_display(self, messages):
+        """批量追加日志消息并滚动到底部，只保留最近 LOG_VIEW_MAX_LINES 行。"""
+        self.log_text.insert(tk.END, "".join(messages))
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_VIEW_MAX_LINES:
+            self.log_text.delete('1.0', f'{line_count - LOG_VIEW_MAX_LINES}.0')
         self.log_text.see(tk.END)
 
     def clear_log(self):
@@ -171,72 +253,68 @@ class MihomoSubscriptionGUI:
         self.progress.start()
         self.result_tree.delete(*self.result_tree.get_children())
         target_date = self.get_target_date()
+        self.init_services()
         self.search_thread = threading.Thread(target=self.search_worker, args=(target_date,), daemon=True)
         self.search_thread.start()
 
     def stop_search(self):
         """停止搜索任务，更新UI状态。"""
         self.is_running = False
+        self.cancel_pipeline()
         self.start_btn.config(state='normal')
         self.stop_btn.config(state='disabled')
         self.progress.stop()
         self.log_message("用户停止了搜索", "WARN")
 
+    def cancel_pipeline(self):
+        """从任意线程取消正在运行的刷新流水线任务。"""
+        loop, task = self.pipeline_loop, self.pipeline_task
+        if loop and task:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # 事件循环已经关闭
+
+    def on_closing(self):
+        """关闭窗口：取消正在运行的刷新，最多等待 SHUTDOWN_JOIN_TIMEOUT 秒后销毁窗口。"""
+        self.is_running = False
+        self.cancel_pipeline()
+        # 阻塞的请求都在守护线程中，不会拖住进程退出；这里只给流水线留出收尾时间
+        if self.search_thread and self.search_thread.is_alive():
+            self.search_thread.join(SHUTDOWN_JOIN_TIMEOUT)
+        self.root.destroy()
+
     def search_worker(self, target_date):
         """
-        搜索任务的核心逻辑。
+        搜索线程入口：在本线程中驱动事件循环执行刷新流水线。
         1. 查找文章 -> 2. 提取链接 -> 3. 验证链接 -> 4. 保存有效链接。
         """
+        import asyncio
         try:
-            self.log_message(f"开始查找 {target_date.strftime('%Y年%m月%d日')} 的 Mihomo 订阅...")
-            
-            # 回溯查找，直到找到有效的文章或达到限制
-            for i in range(8):
-                if not self.is_running:
-                    return
-                current_target_date = datetime.now() - timedelta(days=i)
-                self.log_message(f"尝试查找 {current_target_date.strftime('%Y年%m月%d日')} 的文章...")
-                post_url = self.network.find_post_by_date(current_target_date)
-                
-                if not post_url:
-                    self.log_message(f"未找到 {current_target_date.strftime('%Y年%m月%d日')} 的文章，继续回溯...", "WARN")
-                    continue
-                
-                self.log_message(f"找到文章: {post_url}")
-                mihomo_urls = self.network.extract_mihomo_urls(post_url)
-                
-                if not mihomo_urls:
-                    self.log_message("未找到 Mihomo 订阅链接，继续回溯...", "WARN")
-                    continue
-                
-                self.log_message(f"找到 {len(mihomo_urls)} 个 Mihomo 链接")
-                valid_urls = []
-                for idx, url in enumerate(mihomo_urls):
-                    if not self.is_running:
-                        return
-                    self.log_message(f"验证链接 {idx+1}/{len(mihomo_urls)}: {url[:50]}...")
-                    if self.network.validate_yaml_url(url):
-                        valid_urls.append(url)
-                        self.root.after(0, lambda u=url, i=idx: self.add_result_item(f"Mihomo {i+1}", "✅ 有效", u))
-                    else:
-                        self.root.after(0, lambda u=url, i=idx: self.add_result_item(f"Mihomo {i+1}", "❌ 无效", u))
-                
-                if valid_urls:
-                    self.file_manager.save_subscription_url(valid_urls[0])
-                    self.log_message(f"Mihomo 订阅更新完成！", "SUCCESS")
-                    self.root.after(0, self.refresh_files)
-                    self.root.after(0, lambda: messagebox.showinfo("成功",
-                                                                  f"已更新 Mihomo 订阅！\n文件：{os.path.join(self.save_path_var.get(), '85LA.yaml')}"))
-                    return # 找到并更新成功，结束循环
-                else:
-                    self.log_message("所有找到的链接均无效，继续回溯查找更早的文章...", "WARN")
-
-            self.log_message("回溯查找失败，没有找到有效的 Mihomo 订阅链接。", "ERROR")
-            
+            asyncio.run(self.run_pipeline(target_date))
         except Exception as e:
             self.log_message(f"搜索过程中出错: {e}", "ERROR")
         finally:
-            self.root.after(0, self.search_finished)
+            self.ui_queue.call(self.search_finished)
+
+    async def run_pipeline(self, target_date):
+        """执行一次刷新并在成功时更新界面。"""
+        import asyncio
+        self.pipeline_loop = asyncio.get_running_loop()
+        self.pipeline_task = asyncio.current_task()
+        try:
+            result = await self.pipeline.refresh(target_date)
+        except asyncio.CancelledError:
+            return
+        finally:
+            self.pipeline_loop = None
+            self.pipeline_task = None
+            summary = self.pipeline.metrics.summary()
+            self.ui_queue.call(lambda: self.show_metrics(summary))
+        if result.ok:
+            self.ui_queue.call(self.refresh_files)
+            self.ui_queue.call(lambda: messagebox.showinfo("成功",
+                                                           f"已更新 Mihomo 订阅！\n文件：{os.path.join(self.save_path_var.get(), '85LA.yaml')}"))
 
     def search_finished(self):
         """搜索任务结束后，重置UI状态。"""
@@ -245,10 +323,20 @@ class MihomoSubscriptionGUI:
         self.stop_btn.config(state='disabled')
         self.progress.stop()
 
+    def show_metrics(self, lines):
+        """在性能统计面板中显示各阶段的耗时摘要，两个阶段一行。"""
+        rows = ["    ".join(lines[i:i + 2]) for i in range(0, len(lines), 2)]
+        self.metrics_label.config(text="\n".join(rows) or "没有记录")
+
     def add_result_item(self, desc, status, url):
         """向结果列表添加一个新条目。"""
         self.result_tree.insert('', 'end', text=desc, values=(status, url))
 
+    def add_result_items(self, rows):
+        """批量添加结果条目，rows 为 (描述, 状态, 链接) 列表。"""
+        for desc, status, url in rows:
+            self.add_result_item(desc, status, url)
+
     def on_item_double_click(self, event):
         """双击结果列表项时，打开对应的URL。"""
         sel = self.result_tree.selection()
@@ -256,10 +344,20 @@ class MihomoSubscriptionGUI:
             return
         url = self.result_tree.item(sel[0])['values'][1]
         if url and url.startswith('http') and messagebox.askyesno("打开链接", f"是否打开？\n\n{url}"):
-            webbrowser.open(url)
+            open_url(url)
+
+    def snapshot_store(self, save_dir):
+        """返回 save_dir 的历史快照库；索引只在文件变化后才重新读取。"""
+        from src.core.snapshots import SnapshotStore, SNAPSHOT_DIR
+        directory = os.path.join(save_dir, SNAPSHOT_DIR)
+        if self.snapshots is None or self.snapshots.directory != directory:
+            self.snapshots = SnapshotStore(directory)
+        return self.snapshots
 
     def refresh_files(self):
-        """刷新文件管理标签页的文件列表。"""
+        """刷新文件管理标签页的文件列表：当前的 85LA.yaml 及快照索引中的历史版本。"""
+        if not self.tab_built(self.files_tab):
+            return  # 标签页创建时会自动刷新
         # 清空旧数据
         for item in self.files_tree.get_children():
             self.files_tree.delete(item)
@@ -268,19 +366,30 @@ class MihomoSubscriptionGUI:
         if not os.path.exists(save_dir):
             return
 
+        history = self.snapshot_store(save_dir).entries()
         # 只匹配 85LA.yaml
         file_path = os.path.join(save_dir, "85LA.yaml")
-        if not os.path.isfile(file_path):
+        if os.path.isfile(file_path):
+            mtime = datetime.fromtimestamp(os.path.getmtime(file_path)) \
+                .strftime('%Y-%m-%d %H:%M:%S')
+            size = os.path.getsize(file_path)
+            # 最新快照与当前文件大小一致时即为同一版本，直接显示其节点数
+            nodes = history[0]["nodes"] if history and history[0]["size"] == size else ""
+            self.files_tree.insert('', 'end',
+                                   text=os.path.basename(file_path),
+                                   values=(mtime, nodes if nodes is not None else "", f"{size / 1024:.0f} KB"),
+                                   tags=(file_path,))
+        if not history:
             return
-
-        mtime = datetime.fromtimestamp(os.path.getmtime(file_path)) \
-            .strftime('%Y-%m-%d %H:%M:%S')
-        filename = os.path.basename(file_path)
-
-        self.files_tree.insert('', 'end',
-                               text=filename,
-                               values=(mtime,),
-                               tags=(file_path,))
+        parent = self.files_tree.insert('', 'end', text=f"📜 历史版本 ({len(history)})", values=("", "", ""))
+        for entry in history:
+            saved = datetime.fromtimestamp(entry["date"]).strftime('%Y-%m-%d %H:%M:%S')
+            source = urlsplit(entry["url"] or "").hostname or "未知来源"
+            self.files_tree.insert(parent, 'end',
+                                   text=source,
+                                   values=(saved, entry["nodes"] if entry["nodes"] is not None else "",
+                                           f"{entry['size'] / 1024:.0f} KB"),
+                                   tags=("snapshot", entry["hash"]))
 
     def open_folder(self):
         """打开保存文件的目录。"""
@@ -295,15 +404,25 @@ class MihomoSubscriptionGUI:
         sel = self.files_tree.selection()
         if not sel:
             return
-        file_path = self.files_tree.item(sel[0], 'tags')[0]
+        tags = self.files_tree.item(sel[0], 'tags')
+        if not tags:
+            return
+        if tags[0] == "snapshot":
+            # 快照是压缩文件，解压到历史目录下的预览文件后再显示
+            store = self.snapshot_store(self.save_path_var.get())
+            try:
+                file_path = store.extract(tags[1], os.path.join(store.directory, ".preview.yaml"))
+            except OSError as e:
+                messagebox.showerror("错误", f"无法读取历史版本: {e}")
+                return
+        else:
+            file_path = tags[0]
         self.show_file_content(file_path)
 
     def show_file_content(self, file_path):
         """在预览框中显示指定文件的内容。"""
         try:
-            content = self.file_manager.read_file_content(file_path)
-            self.preview_text.delete(1.0, tk.END)
-            self.preview_text.insert(1.0, content)
+            self.preview.load(file_path)
             self.notebook.select(self.files_tab)
         except Exception as e:
             messagebox.showerror("错误", f"无法读取文件: {e}")
\ No newline at end of file
@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
-import webbrowser  # Added import to fix undefined variable
 
-from src.gui.ui_utils import copy_to_clipboard, on_title_click
+from src.gui.ui_utils import copy_to_clipboard, on_title_click, open_url
+from src.gui.virtual_preview import VirtualPreview
 
 
 def create_main_tab(self):
@@ -76,6 +76,15 @@ def create_main_tab(self):
     vsb.pack(side='right', fill='y', padx=(0, 8), pady=6)
     self.result_tree.bind('<Double-1>', self.on_item_double_click)
 
+    # 性能统计
+    metrics_frame = tk.LabelFrame(self.main_tab, text="⏱ 性能统计",
+                                  font=('微软雅黑', 9, 'bold'),
+                                  bg='#f0f0f0', fg='#2c3e50')
+    metrics_frame.pack(fill='x', pady=(0, 8))
+    self.metrics_label = tk.Label(metrics_frame, text="尚未运行", bg='#f0f0f0', fg='#7f8c8d',
+                                  font=('微软雅黑', 8), justify='left', anchor='w')
+    self.metrics_label.pack(fill='x', padx=8, pady=4)
+
     # 日志
     log_frame = tk.LabelFrame(self.main_tab, text="📝 运行日志",
                               font=('微软雅黑', 9, 'bold'),
@@ -94,7 +103,7 @@ def create_files_tab(self):
     path_frame.pack(fill='x', padx=8, pady=6)
     tk.Label(path_frame, text="文件夹路径:", font=('微软雅黑', 8),
              bg='#f0f0f0').pack(side='left')
-    self.files_path_label = tk.Label(path_frame, text=self.DEFAULT_SAVE_DIR,
+    self.files_path_label = tk.Label(path_frame, text=self.save_path_var.get(),
                                      font=('微软雅黑', 8), bg='#f0f0f0', fg='#2c3e50')
     self.files_path_label.pack(side='left', padx=5)
 
@@ -117,12 +126,17 @@ def create_files_tab(self):
                                  bg='#f0f0f0', fg='#2c3e50')
     files_frame.pack(side='left', fill='both', expand=True, padx=(0, 4))
     
-    self.files_tree = ttk.Treeview(files_frame, columns=('date',),
+    # 历史版本作为子节点列出，数据来自快照索引
+    self.files_tree = ttk.Treeview(files_frame, columns=('date', 'nodes', 'size'),
                            show='tree headings')
     self.files_tree.heading('#0', text='文件名')
     self.files_tree.heading('date', text='修改时间')
+    self.files_tree.heading('nodes', text='节点')
+    self.files_tree.heading('size', text='大小')
     self.files_tree.column('#0', width=120)
-    self.files_tree.column('date', width=140)
+    self.files_tree.column('date', width=130)
+    self.files_tree.column('nodes', width=45, anchor='e')
+    self.files_tree.column('size', width=65, anchor='e')
     
     files_vsb = ttk.Scrollbar(files_frame, orient='vertical', command=self.files_tree.yview)
     self.files_tree.configure(yscrollcommand=files_vsb.set)
@@ -136,10 +150,11 @@ def create_files_tab(self):
                                   bg='#f0f0f0', fg='#2c3e50')
     preview_frame.pack(side='right', fill='both', expand=True, padx=(4, 0))
     
-    self.preview_text = scrolledtext.ScrolledText(preview_frame, height=20,
-                                                  font=('Consolas', 8),
-                                                  bg='#34495e', fg='#ecf0f1')
-    self.preview_text.pack(fill='both', expand=True, padx=8, pady=6)
+    # 虚拟化预览：只渲染可见的行，大文件也不会卡住界面
+    self.preview = VirtualPreview(preview_frame, height=20,
+                                  font=('Consolas', 8),
+                                  bg='#34495e', fg='#ecf0f1')
+    self.preview.pack(fill='both', expand=True, padx=8, pady=6)
 
 
 def create_about_tab(self):
@@ -210,7 +225,7 @@ def create_about_tab(self):
     github_label = tk.Label(github_frame, text="https://github.com/Heimo-WU", font=('微软雅黑', 9),
                             bg='#f0f0f0', fg='#3498db', cursor='hand2')
     github_label.pack(side='left')
-    github_label.bind('<Button-1>', lambda e: webbrowser.open("https://github.com/Heimo-WU"))
+    github_label.bind('<Button-1>', lambda e: open_url("https://github.com/Heimo-WU"))
 
     # 软件信息 (row=2)
     intro_frame = tk.LabelFrame(
@@ -266,7 +281,7 @@ def create_about_tab(self):
                            font=('微软雅黑', 9, 'bold'),
                            bg='#f0f0f0', fg='#3498db', cursor='hand2')
     source_link.pack(side='left', padx=(10, 0))
-    source_link.bind('<Button-1>', lambda e: webbrowser.open("https://www.85la.com/"))
+    source_link.bind('<Button-1>', lambda e: open_url("https://www.85la.com/"))
 
     tk.Label(source_frame, text="感谢 85LA 提供的免费节点服务！", font=('微软雅黑', 9),
              bg='#f0f0f0', fg='#2c3e50').pack(padx=15, pady=(0, 10))
@@ -0,0 +1,59 @@
+# refactored_mihomo/src/gui/ui_queue.py
+import queue
+
+from src.utils.constants import UI_TICK_MS
+
+CALL = "call"
+
+
+class UiUpdateQueue:
+    """
+    线程安全的界面更新通道：任意线程只负责 post() 入队，
+    Tk 主循环每 tick_ms 毫秒取出一批事件，把同类的连续事件合并后交给对应的处理函数。
+    """
+
+    def __init__(self, root, tick_ms=UI_TICK_MS, max_batch=1000):
+        self.root = root
+        self.tick_ms = tick_ms
+        self.max_batch = max_batch
+        self.queue = queue.SimpleQueue()
+        self.handlers = {CALL: lambda funcs: [func() for func in funcs]}
+        self.timer = None
+
+    def register(self, kind, handler):
+        """注册批量处理函数：handler(本批次该类事件的数据列表)，在主线程中调用。"""
+        self.handlers[kind] = handler
+
+    def post(self, kind, payload):
+        self.queue.put((kind, payload))
+
+    def call(self, func):
+        """在主线程中执行 func，代替从工作线程调用 root.after(0, ...)。"""
+        self.post(CALL, func)
+
+    def start(self):
+        if self.timer is None:
+            self.timer = self.root.after(self.tick_ms, self._drain)
+
+    def stop(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def _drain(self):
+        runs = []
+        try:
+            for _ in range(self.max_batch):
+                kind, payload = self.queue.get_nowait()
+                # 保持事件顺序：只合并相邻的同类事件
+                if runs and runs[-1][0] == kind:
+                    runs[-1][1].append(payload)
+                else:
+                    runs.append((kind, [payload]))
+        except queue.Empty:
+            pass
+        try:
+            for kind, payloads in runs:
+                self.handlers[kind](payloads)
+        finally:
+            self.timer = self.root.after(self.tick_ms, self._drain)
\ No newline at end of file
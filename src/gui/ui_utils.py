@@ -3,6 +3,12 @@ import tkinter as tk
 from tkinter import messagebox
 
 
+def open_url(url):
+    """用系统浏览器打开链接（按需导入 webbrowser，避免拖慢启动）"""
+    import webbrowser
+    webbrowser.open(url)
+
+
 def copy_to_clipboard(self, text):
     """复制文本到剪贴板"""
     self.root.clipboard_clear()
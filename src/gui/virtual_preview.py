@@ -0,0 +1,128 @@
+# refactored_mihomo/src/gui/virtual_preview.py
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk, messagebox
+
+from src.core.line_index import LineIndex
+
+
+class VirtualPreview(tk.Frame):
+    """
+    虚拟化的文件预览：只渲染可见窗口内的行，滚动时按行偏移索引重新读取。
+    预览开销只与窗口高度有关，与文件大小无关；支持跳转到行和搜索。
+    """
+
+    def __init__(self, master, **text_options):
+        super().__init__(master, bg=master.cget('bg'))
+        self.index = None
+        self.top = 0
+        self.visible = 1
+        self.match_line = -1
+
+        toolbar = tk.Frame(self, bg=self.cget('bg'))
+        toolbar.pack(fill='x', pady=(0, 4))
+        tk.Label(toolbar, text="行:", font=('微软雅黑', 8), bg=self.cget('bg')).pack(side='left')
+        self.line_var = tk.StringVar()
+        line_entry = tk.Entry(toolbar, textvariable=self.line_var, width=7, font=('微软雅黑', 8))
+        line_entry.pack(side='left', padx=(2, 4))
+        line_entry.bind('<Return>', lambda e: self.jump_to_line())
+        tk.Button(toolbar, text="跳转", command=self.jump_to_line, font=('微软雅黑', 7),
+                  bg='#3498db', fg='white', relief='flat', padx=6).pack(side='left', padx=(0, 8))
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(toolbar, textvariable=self.search_var, font=('微软雅黑', 8))
+        search_entry.pack(side='left', fill='x', expand=True, padx=(0, 4))
+        search_entry.bind('<Return>', lambda e: self.search_next())
+        tk.Button(toolbar, text="搜索", command=self.search_next, font=('微软雅黑', 7),
+                  bg='#3498db', fg='white', relief='flat', padx=6).pack(side='left')
+        self.status_label = tk.Label(toolbar, text="", font=('微软雅黑', 8), bg=self.cget('bg'), fg='#2c3e50')
+        self.status_label.pack(side='right', padx=(6, 0))
+
+        body = tk.Frame(self, bg=self.cget('bg'))
+        body.pack(fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.text = tk.Text(body, wrap='none', **text_options)
+        self.text.pack(side='left', fill='both', expand=True)
+        self.text.tag_configure('match', background='#f39c12', foreground='#2c3e50')
+        self.text.configure(state='disabled')
+        self.line_height = max(1, tkfont.Font(font=self.text.cget('font')).metrics('linespace'))
+
+        self.text.bind('<Configure>', self.on_resize)
+        self.text.bind('<MouseWheel>', lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.text.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll_by(3))
+        self.text.bind('<Prior>', lambda e: self.scroll_by(-self.visible))
+        self.text.bind('<Next>', lambda e: self.scroll_by(self.visible))
+
+    def load(self, file_path):
+        """为文件建立行索引并显示开头部分。"""
+        self.index = LineIndex(file_path)
+        self.top = 0
+        self.match_line = -1
+        self.render()
+
+    def total(self):
+        return len(self.index) if self.index is not None else 0
+
+    def render(self):
+        """只读取并显示 [top, top + visible) 范围内的行。"""
+        if self.index is not None and self.index.is_stale():
+            try:
+                self.index.rebuild()
+            except OSError:
+                self.index = None  # 文件已被删除
+        total = self.total()
+        self.top = max(0, min(self.top, total - self.visible))
+        lines = self.index.lines(self.top, self.visible) if self.index is not None else []
+        self.text.configure(state='normal')
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', "\n".join(lines))
+        if self.top <= self.match_line < self.top + self.visible:
+            row = self.match_line - self.top + 1
+            self.text.tag_add('match', f'{row}.0', f'{row}.end')
+        self.text.configure(state='disabled')
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+            self.status_label.config(text=f"{self.top + 1}-{min(total, self.top + self.visible)} / {total} 行")
+        else:
+            self.scrollbar.set(0, 1)
+            self.status_label.config(text="")
+
+    def on_resize(self, event):
+        visible = max(1, event.height // self.line_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.top = int(float(amount) * self.total())
+            self.render()
+        elif action == 'scroll':
+            step = self.visible if unit == 'pages' else 1
+            self.scroll_by(int(amount) * step)
+
+    def scroll_by(self, lines):
+        self.top += lines
+        self.render()
+        return 'break'
+
+    def jump_to_line(self):
+        try:
+            line = int(self.line_var.get()) - 1
+        except ValueError:
+            return
+        self.top = max(0, line)
+        self.render()
+
+    def search_next(self):
+        """从上一个匹配的下一行开始搜索，找到后滚动到该行并高亮。"""
+        if self.index is None:
+            return
+        line = self.index.search(self.search_var.get(), self.match_line + 1)
+        if line == -1:
+            messagebox.showinfo("搜索", "未找到匹配内容")
+            return
+        self.match_line = line
+        self.top = max(0, line - self.visible // 3)
+        self.render()
@@ -0,0 +1,103 @@
+# refactored_mihomo/src/utils/charset.py
+import codecs
+import re
+import threading
+
+SAMPLE_SIZE = 4096
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+# 无任何声明时按顺序尝试的编码；gb18030 兼容 gbk/gb2312
+FALLBACK_ENCODINGS = ("utf-8", "gb18030", "big5")
+
+
+def _normalize(name):
+    """规范化编码名称，未知编码返回 None；gbk/gb2312 统一提升为 gb18030。"""
+    try:
+        name = codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+    return "gb18030" if name in ("gbk", "gb2312") else name
+
+
+class CharsetDetector:
+    """
+    单次字符集识别：BOM -> HTTP 头 -> HTML meta -> 有界字节样本启发式。
+    含非 ASCII 字节的样本的启发式结果按主机缓存，识别后整个响应体只需解码一次。
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.host_cache = {}
+        self.lock = threading.Lock()
+
+    def detect(self, data, content_type=None, host=None):
+        """返回 data（可以只是响应开头的一段）的编码名称。"""
+        sample = data[:self.sample_size]
+        for bom, encoding in BOMS:
+            if sample.startswith(bom):
+                return encoding
+        if content_type:
+            match = HEADER_CHARSET.search(content_type)
+            encoding = match and _normalize(match.group(1))
+            if encoding:
+                return encoding
+        match = META_CHARSET.search(sample)
+        encoding = match and _normalize(match.group(1))
+        if encoding:
+            return encoding
+        with self.lock:
+            encoding = self.host_cache.get(host)
+        if encoding:
+            return encoding
+        if sample.isascii():
+            match = NON_ASCII.search(data)
+            if match is None:
+                # 纯 ASCII 内容无法区分候选编码，结果不缓存，以免把该主机固定为 utf-8
+                return FALLBACK_ENCODINGS[0]
+            # 开头是 ASCII 时从第一个非 ASCII 字节处取样
+            sample = data[match.start():match.start() + self.sample_size]
+        encoding = self._sniff(sample)
+        if host:
+            with self.lock:
+                self.host_cache[host] = encoding
+        return encoding
+
+    @staticmethod
+    def _sniff(sample):
+        for encoding in FALLBACK_ENCODINGS:
+            try:
+                # 增量解码器允许样本末尾被截断的多字节字符
+                codecs.getincrementaldecoder(encoding)().decode(sample)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return "latin-1"
+
+
+
+_detector = CharsetDetector()
+
+
+def detect_charset(data, content_type=None, host=None):
+    return _detector.detect(data, content_type, host)
+
+
+def is_undecided(data, content_type=None):
+    """
+    data 全是 ASCII 且响应头和 meta 都没有声明编码时返回 True。此时各候选编码的解码结果相同，
+    流式解码可以等到第一个含非 ASCII 字节的数据块再识别编码。
+    """
+    if not data.isascii():
+        return False
+    if content_type and HEADER_CHARSET.search(content_type):
+        return False
+    return not META_CHARSET.search(data[:SAMPLE_SIZE])
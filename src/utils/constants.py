@@ -1,10 +1,10 @@
 # refactored_mihomo/src/utils/constants.py
-import os
-import logging
-
-from config import SAVE_DIR, BASE_URL, TIMEOUT, RETRY
-
-os.makedirs(SAVE_DIR, exist_ok=True)
-logging.basicConfig(level=logging.INFO,
-                    format="%(asctime)s [%(levelname)s] %(message)s")
-logger = logging.getLogger(__name__)
\ No newline at end of file
+from config import (SAVE_DIR, BASE_URL, TIMEOUT, RETRY, CONNECT_TIMEOUT, POOL_MAXSIZE,
+                    VALIDATE_WORKERS, VALIDATE_PER_HOST, VALIDATE_RATE, HTTP_CACHE_MAX_BYTES,
+                    MAX_YAML_BYTES, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN, LOG_JSON,
+                    UI_TICK_MS, LOG_VIEW_MAX_LINES, MERGE_MODE, MERGE_DEADLINE,
+                    PROBE_ACTION, PROBE_CONCURRENCY, PROBE_TIMEOUT, STATE_POST_TTL, STATE_URLS_TTL,
+                    STATE_VALIDATION_TTL, REFRESH_DEADLINE, STATE_HOST_TTL,
+                    BREAKER_THRESHOLD, BREAKER_COOLDOWN, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY,
+                    HEDGE_MAX_DELAY, SOURCE_DEADLINE, SNAPSHOT_KEEP, SNAPSHOT_MAX_AGE,
+                    BLOCKING_WORKERS)
@@ -1,18 +1,70 @@
 # refactored_mihomo/src/utils/logger.py
 import os
+import json
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+from src.utils.constants import LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN, LOG_JSON
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON（JSON Lines）。"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
 
 
 class MihomoLogger:
-    def __init__(self, save_dir):
+    """
+    非阻塞日志：调用线程只把记录放入队列，由单个后台 QueueListener 写入文件和控制台。
+    mihomo_auto.log 按大小（或按时间，见 LOG_ROTATE_WHEN）轮转，可选输出 JSON Lines。
+    """
+
+    def __init__(self, save_dir, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 rotate_when=LOG_ROTATE_WHEN, json_lines=LOG_JSON):
         log_file = os.path.join(save_dir, "mihomo_auto.log")
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[logging.FileHandler(log_file, encoding='utf-8'),
-                      logging.StreamHandler()]
-        )
-        self.logger = logging.getLogger(__name__)
+        if rotate_when:
+            file_handler = TimedRotatingFileHandler(log_file, when=rotate_when,
+                                                    backupCount=backup_count, encoding='utf-8')
+        else:
+            file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                               backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, file_handler, stream_handler)
+        self.listener.start()
+        atexit.register(self.close)
+
+        self.logger = logging.getLogger("mihomo")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(QueueHandler(self.queue))
 
     def log(self, message, level='INFO'):
-        getattr(self.logger, level.lower(), self.logger.info)(message)
\ No newline at end of file
+        getattr(self.logger, level.lower(), self.logger.info)(message)
+
+    def close(self):
+        """停止后台线程（会先写完队列中剩余的记录）并关闭文件。"""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
\ No newline at end of file
@@ -0,0 +1,138 @@
+# refactored_mihomo/src/utils/metrics.py
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 刷新流水线的阶段，按执行顺序排列
+STAGES = ("homepage_fetch", "homepage_parse", "post_fetch", "extract", "validate", "download", "decode", "save")
+STAGE_LABELS = {
+    "homepage_fetch": "首页请求", "homepage_parse": "首页解析", "post_fetch": "文章请求", "extract": "链接提取",
+    "validate": "订阅验证", "download": "订阅下载", "decode": "解码", "save": "保存",
+}
+PROM_FILE = "metrics.prom"
+JSON_FILE = "metrics.json"
+
+
+class Span:
+    """一次阶段计时；调用方可在 with 块内累加 bytes 和 retries。"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.bytes = 0
+        self.retries = 0
+        self.seconds = 0.0
+        self.error = False
+
+
+class MetricsRecorder:
+    """
+    线程安全的阶段指标：按阶段累计一次刷新中的调用次数、耗时、字节数、重试次数和失败次数，
+    刷新结束后导出为 Prometheus 文本文件和 JSON。每次刷新使用一个新的实例。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+
+    @contextmanager
+    def span(self, stage):
+        span = Span(stage)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            span.seconds = time.perf_counter() - started
+            self.add(stage, span.seconds, span.bytes, span.retries, int(span.error))
+
+    def add(self, stage, seconds=0.0, nbytes=0, retries=0, errors=0, calls=1):
+        with self.lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "bytes": 0, "retries": 0, "errors": 0})
+            entry["calls"] += calls
+            entry["seconds"] += seconds
+            entry["bytes"] += nbytes
+            entry["retries"] += retries
+            entry["errors"] += errors
+
+    def snapshot(self):
+        with self.lock:
+            stages = {stage: dict(entry) for stage, entry in self.stages.items()}
+        return {"started": self.started, "stages": stages}
+
+    def summary(self):
+        """按阶段生成简短的文字摘要，每个阶段一行。"""
+        stages = self.snapshot()["stages"]
+        lines = []
+        for stage in sorted(stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            entry = stages[stage]
+            line = f"{STAGE_LABELS.get(stage, stage)}: {entry['calls']} 次 {entry['seconds'] * 1000:.0f} ms"
+            if entry["bytes"]:
+                line += f" {entry['bytes'] / 1024:.1f} KB"
+            if entry["retries"]:
+                line += f" 重试 {entry['retries']}"
+            if entry["errors"]:
+                line += f" 失败 {entry['errors']}"
+            lines.append(line)
+        return lines
+
+    def export(self, save_dir, status):
+        """把本次刷新的指标写入 save_dir 下的 metrics.prom 和 metrics.json（原子替换）。"""
+        snapshot = self.snapshot()
+        finished = time.time()
+        snapshot.update(status=status, finished=finished, duration=finished - snapshot["started"])
+
+        lines = [
+            "# HELP mihomo_refresh_duration_seconds 最近一次刷新的总耗时",
+            "# TYPE mihomo_refresh_duration_seconds gauge",
+            f"mihomo_refresh_duration_seconds {snapshot['duration']:.6f}",
+            "# HELP mihomo_refresh_success 最近一次刷新是否成功",
+            "# TYPE mihomo_refresh_success gauge",
+            f"mihomo_refresh_success {int(status == 'success')}",
+            "# HELP mihomo_refresh_timestamp_seconds 最近一次刷新完成的时间",
+            "# TYPE mihomo_refresh_timestamp_seconds gauge",
+            f"mihomo_refresh_timestamp_seconds {finished:.3f}",
+        ]
+        for field, help_text in (("calls", "阶段调用次数"), ("seconds", "阶段累计耗时"), ("bytes", "阶段传输字节数"),
+                                 ("retries", "阶段重试次数"), ("errors", "阶段失败次数")):
+            name = "mihomo_stage_duration_seconds" if field == "seconds" else f"mihomo_stage_{field}"
+            lines.append(f"# HELP {name} 最近一次刷新的{help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for stage, entry in snapshot["stages"].items():
+                lines.append(f'{name}{{stage="{stage}"}} {entry[field]}')
+
+        os.makedirs(save_dir, exist_ok=True)
+        self._write(os.path.join(save_dir, PROM_FILE), "\n".join(lines) + "\n")
+        self._write(os.path.join(save_dir, JSON_FILE), json.dumps(snapshot, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def _write(path, text):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+# 当前刷新的指标记录器；asyncio 任务自动继承，run_in_thread() 把它带入工作线程
+_current = contextvars.ContextVar("mihomo_metrics", default=None)
+
+
+@contextmanager
+def recording(recorder):
+    """在 with 块内（包括其中创建的任务和 run_in_thread 线程）把指标记入 recorder。"""
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+def current_metrics():
+    """返回当前刷新的指标记录器；不在刷新中时返回一个不会导出的新记录器。"""
+    recorder = _current.get()
+    return recorder if recorder is not None else MetricsRecorder()
@@ -1,13 +1,62 @@
 # refactored_mihomo/src/utils/validators.py
-import requests
+import re
 
-def validate_yaml_url(url):
+SNIFF_BYTES = 64 * 1024
+# 顶层的 proxies: / proxy-groups: 键
+CONFIG_KEY_PATTERN = re.compile(rb"^(?:proxies|proxy-groups)[ \t]*:", re.MULTILINE)
+HTML_PATTERN = re.compile(rb"^\s*<(?:!doctype|html|head|body|\?xml)", re.IGNORECASE)
+REJECTED_CONTENT_TYPES = ("text/html", "application/xhtml", "image/", "video/", "audio/")
+
+
+class InvalidSubscription(ValueError):
+    """响应确定不是 Mihomo 配置（Content-Type 不符或内容结构不符），与网络错误等暂时性失败区分。"""
+
+
+class SubscriptionUnchanged(Exception):
+    """服务器返回 304，且缓存内容解码后的哈希与上次保存的订阅相同，无需解码和解析。"""
+
+
+def is_config_content_type(content_type):
+    """Content-Type 是否可能是 yaml 配置（订阅服务器常用 text/plain 或 octet-stream，只排除明显不是的类型）。"""
+    content_type = (content_type or "").lower()
+    return not any(content_type.startswith(prefix) for prefix in REJECTED_CONTENT_TYPES)
+
+
+def sniff_mihomo_config(head, final=False):
+    """
+    根据响应体开头判断是否为 Mihomo 配置：找到顶层 proxies / proxy-groups 键返回 True，
+    像 HTML 页面或已读够 SNIFF_BYTES（final 为 True 时为读完）仍未找到返回 False，还无法判断时返回 None。
+    """
+    head = head.lstrip(b"\xef\xbb\xbf")
+    if HTML_PATTERN.match(head):
+        return False
+    if CONFIG_KEY_PATTERN.search(head):
+        return True
+    if final or len(head) >= SNIFF_BYTES:
+        return False
+    return None
+
+
+def iter_config_chunks(chunks):
     """
-    通过HEAD请求验证URL是否可访问。
+    包装响应体数据块：确认开头是 Mihomo 配置后才逐块放行，否则抛出 InvalidSubscription。
+    调用方可据此在第一个数据块后就中止下载。
     """
-    try:
-        # 使用 HEAD 请求，更快且不下载整个文件
-        resp = requests.head(url, timeout=10, allow_redirects=True)
-        return resp.status_code == 200
-    except requests.RequestException:
-        return False
\ No newline at end of file
+    head = b""
+    for chunk in chunks:
+        if head is None:
+            yield chunk
+            continue
+        head += chunk
+        verdict = sniff_mihomo_config(head)
+        if verdict is None:
+            continue
+        if not verdict:
+            raise InvalidSubscription("响应内容不是 Mihomo 配置")
+        yield head
+        head = None
+    if head is not None:
+        if not sniff_mihomo_config(head, final=True):
+            raise InvalidSubscription("响应内容不是 Mihomo 配置")
+        yield head
+